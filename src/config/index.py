@@ -48,5 +48,39 @@ appConfig = {
     "redis_url": os.getenv("REDIS_URL"),
     "openai_api_key": os.getenv("OPENAI_API_KEY"),
     "scrapingbee_api_key": os.getenv("SCRAPINGBEE_API_KEY"),
-    "tavily_api_key": os.getenv("TAVILY_API_KEY")
+    "tavily_api_key": os.getenv("TAVILY_API_KEY"),
+    # Optional ingestion tuning
+    "summary_max_concurrency": int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4")),
+    "embedding_max_concurrency": int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4")),
+    "embedding_batch_max_tokens": int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "200000")),
+    "embedding_batch_linger_seconds": float(os.getenv("EMBEDDING_BATCH_LINGER_SECONDS", "2")),
+    "pdf_partition_workers": int(os.getenv("PDF_PARTITION_WORKERS", str(os.cpu_count() or 1))),
+    "pdf_pages_per_partition": int(os.getenv("PDF_PAGES_PER_PARTITION", "10")),
+    # Image preprocessing before vision summaries (drop icons / blank images, downscale, re-encode as JPEG)
+    "image_min_dimension": int(os.getenv("IMAGE_MIN_DIMENSION", "48")),
+    "image_min_entropy": float(os.getenv("IMAGE_MIN_ENTROPY", "1.5")),
+    "image_max_dimension": int(os.getenv("IMAGE_MAX_DIMENSION", "1536")),
+    "image_jpeg_quality": int(os.getenv("IMAGE_JPEG_QUALITY", "80")),
+    "image_low_detail_max_dimension": int(os.getenv("IMAGE_LOW_DETAIL_MAX_DIMENSION", "512")),
+    # Perceptual-hash dedup of repeated images (logos, headers) within a document, optionally across a project
+    "image_dedup_max_distance": int(os.getenv("IMAGE_DEDUP_MAX_DISTANCE", "6")),
+    "image_boilerplate_min_chunks": int(os.getenv("IMAGE_BOILERPLATE_MIN_CHUNKS", "3")),
+    "image_dedup_project_scope": os.getenv("IMAGE_DEDUP_PROJECT_SCOPE", "false").lower() == "true",
+    "image_boilerplate_min_documents": int(os.getenv("IMAGE_BOILERPLATE_MIN_DOCUMENTS", "3")),
+    "image_cache_max_entries": int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "256")),
+    "ingestion_max_in_flight": int(os.getenv("INGESTION_MAX_IN_FLIGHT", "8")),
+    "ingestion_lease_seconds": int(os.getenv("INGESTION_LEASE_SECONDS", "3600")),
+    "ingestion_dispatch_interval_seconds": int(os.getenv("INGESTION_DISPATCH_INTERVAL_SECONDS", "60")),
+    # Optional retrieval tuning
+    "retrieval_search_workers": int(os.getenv("RETRIEVAL_SEARCH_WORKERS", "16")),
+    "retrieval_leg_timeout_seconds": float(os.getenv("RETRIEVAL_LEG_TIMEOUT_SECONDS", "5")),
+    "retrieval_search_timeout_seconds": float(os.getenv("RETRIEVAL_SEARCH_TIMEOUT_SECONDS", "8")),
+    "retrieval_max_parallel_queries": int(os.getenv("RETRIEVAL_MAX_PARALLEL_QUERIES", "5")),
+    "retrieval_query_timeout_seconds": float(os.getenv("RETRIEVAL_QUERY_TIMEOUT_SECONDS", "10")),
+    # Optional cache settings
+    "cache_redis_url": os.getenv("CACHE_REDIS_URL") or os.getenv("REDIS_URL"),
+    "embedding_cache_max_entries": int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000")),
+    "summary_cache_ttl_seconds": int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+    "query_embedding_cache_max_entries": int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "1024")),
+    "query_embedding_cache_ttl_seconds": int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600))),
 }
@@ -43,12 +43,27 @@ class ProcessingStatus(str, Enum):
     SUMMARISING = "summarising"
     VECTORIZATION = "vectorization"
     COMPLETED = "completed"
+    FAILED = "failed"  # Ingestion failed for good (retries exhausted) - the last committed version stays searchable.
+
+
+class ReprocessRequest(BaseModel):
+    incremental: bool = Field(True, description="Only re-embed chunks that changed since the last ingestion")
+    resume: bool = Field(False, description="Continue a failed ingestion from its last checkpointed stage")
 
 
 class UrlRequest(BaseModel):
     url: str = Field(..., description="The URL to process")
 
 
+class BatchIngestionRequest(BaseModel):
+    files: List[FileUploadRequest] = Field(default_factory=list, description="Files to upload, a presigned upload url is returned for each")
+    urls: List[str] = Field(default_factory=list, description="Website URLs to process")
+
+
+class BatchConfirmRequest(BaseModel):
+    s3_keys: Optional[List[str]] = Field(None, description="Uploaded files to process (defaults to every pending file of the batch)")
+
+
 class MessageCreate(BaseModel):
     content: str = Field(..., description="The content of the message")
 
@@ -1,19 +1,49 @@
 from src.services.supabase import supabase
 import os
 import time
-from src.services.llm import openAI
+import base64
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from src.services.awsS3 import s3_client
+from src.services.imageStore import store_image
+from src.services.embeddingCache import get_cached_embeddings, set_cached_embeddings, embedding_cache_key, pack_embedding, unpack_embedding
 from src.config.index import appConfig
-from src.rag.ingestion.utils import partition_document, analyze_elements, separate_content_types, get_page_number, create_ai_summary
+from src.rag.ingestion.utils import partition_document, analyze_elements, separate_content_types, preprocess_chunk_images, deduplicate_document_images, get_page_number, create_ai_summary, build_insert_batches, compute_chunk_fingerprint, run_stage_in_background, EmbeddingBatcher, save_stage_output, load_stage_output, delete_stage_outputs, StageCheckpoint
 from src.models.index import ProcessingStatus
+from src.services.ingestionScheduler import renew_ingestion_lease
 from unstructured.chunking.title import chunk_by_title
+from unstructured.staging.base import elements_to_dicts, elements_from_dicts
 from src.services.webScrapper import scrapingbee_client
 from src.config.logging import get_logger, set_project_id
 
 logger = get_logger(__name__)
 
+# Bulk insert limits per PostgREST request. Each row carries a 1536-float embedding (~30KB as JSON) plus original_content.
+INSERT_BATCH_MAX_ROWS = 100
+INSERT_BATCH_MAX_BYTES = 4 * 1024 * 1024
 
-def process_document(document_id: str):
+# AI summary attempts per chunk before falling back to the chunk's plain text.
+SUMMARY_MAX_ATTEMPTS = 3
+
+# Streaming pipeline buffers (processed chunks waiting for embedding / chunk rows with embeddings waiting for storage).
+PIPELINE_SUMMARISED_BUFFER = 32
+PIPELINE_VECTORIZED_BUFFER = 2 * INSERT_BATCH_MAX_ROWS
+
+# ProgressReporter throttling : at most one progress write per stage every 2s, and only after 5% progress or 15s.
+PROGRESS_MIN_INTERVAL_SECONDS = 2.0
+PROGRESS_MAX_INTERVAL_SECONDS = 15.0
+PROGRESS_MIN_PERCENT_STEP = 5.0
+
+# Checkpointed stage outputs (S3, see StageCheckpoint) : a retry / resume continues from the last completed work.
+ELEMENTS_STAGE = "elements"
+CHUNKS_STAGE = "chunks"
+SUMMARIES_STAGE = "summaries"
+EMBEDDINGS_STAGE = "embeddings"
+
+
+def process_document(document_id: str, incremental: bool = False, resume: bool = False):
     """
     * Step 1 : Download from S3 (file) or Crawl the URL (url) and Extract text, tables, and images from the PDF (using Unstructured Library) from the AWS S3 document.
     * Step 2 : Split the extracted content into chunks.
@@ -21,10 +51,42 @@ def process_document(document_id: str):
     * Step 4 : Create vector embeddings of chunk and store in PostgreSQL.
     * Update the project document record with the processing_status and processing_details as needed.
     *   - `processing_details` : What type of elements or metadata did we retrieve from the document to show in the UI.
+
+    incremental=True (re-ingestion) : chunks are fingerprinted and diffed against the stored chunks of the document.
+    Only new chunks are summarised, embedded and inserted; removed chunks are deleted and unchanged ones only renumbered.
+
+    Every stage checkpoints its output (elements, chunks, summaries, embeddings) until the document is completed.
+    resume=True continues from those checkpoints (e.g. after a failure in Step 4), otherwise they are dropped first.
+
+    Runs both stages in this process. The Celery workers run them as separate tasks on separate queues instead
+    (Step 1 + 2 are CPU-bound, Step 3 + 4 wait on the network), see src/services/celery.py.
     """
-    logger.info("document_processing_started", document_id=document_id)
+    if not resume:
+        delete_stage_outputs(document_id)
+    chunking_result = partition_and_chunk_document(document_id, incremental)
+    return summarise_vectorize_and_store_document(document_id, chunking_result)
+
+
+def partition_and_chunk_document(document_id: str, incremental: bool = False):
+    """
+    CPU-bound stage : Step 1 (download + partition) and Step 2 (chunking), skipped as far as checkpoints allow.
+    Returns the chunking result consumed by summarise_vectorize_and_store_document (JSON-serialisable, also saved as the
+    "chunks" checkpoint, which hands it over to the io worker):
+    {
+        "project_id": "...",
+        "incremental": False,
+        "prepared_chunks": [{"chunk_index": 0, "page_number": 1, "content_data": {...}, "content_hash": "9f2c..."}, ...],
+        "chunk_diff": None,  # incremental only, see diff_chunks_against_database
+    }
+    """
+    logger.info("document_processing_started", document_id=document_id, incremental=incremental)
 
     try:
+        chunking_result = load_stage_output(document_id, CHUNKS_STAGE)
+        if chunking_result is not None:
+            logger.info("chunking_resumed_from_checkpoint", document_id=document_id, chunks=len(chunking_result["prepared_chunks"]))
+            return chunking_result
+
         update_status_in_database(document_id, ProcessingStatus.PROCESSING)
 
         document_result = supabase.table("project_documents").select("*").eq("id", document_id).execute()
@@ -32,44 +94,178 @@ def process_document(document_id: str):
             logger.error("document_not_found", document_id=document_id)
             raise Exception(f"Failed to get project document record with id: {document_id}")
         document = document_result.data[0]
+        source_type = document.get("source_type") or "file"
         set_project_id(document["project_id"])
-        logger.info("document_retrieved", document_id=document_id, source_type=document.get("source_type"))
+        logger.info("document_retrieved", document_id=document_id, source_type=source_type)
 
         # Step 1 : Download from S3 (file) or Crawl the URL (url) and Extract content.
-        update_status_in_database(document_id, ProcessingStatus.PARTITIONING)
-        elements_summary, elements = download_content_and_partition(document_id, document)
+        elements_checkpoint = load_stage_output(document_id, ELEMENTS_STAGE)
+        if elements_checkpoint is not None:
+            elements_summary, partition_details = elements_checkpoint["elements_summary"], elements_checkpoint["partition_details"]
+            elements = elements_from_dicts(elements_checkpoint["elements"])
+            logger.info("partitioning_resumed_from_checkpoint", document_id=document_id, elements_count=len(elements))
+        else:
+            update_status_in_database(document_id, ProcessingStatus.PARTITIONING)
+            elements_summary, elements, partition_details = download_content_and_partition(document_id, document)
+            save_stage_output(
+                document_id,
+                ELEMENTS_STAGE,
+                {"elements": elements_to_dicts(elements), "elements_summary": elements_summary, "partition_details": partition_details},
+            )
 
-        logger.info("partitioning_completed", document_id=document_id, elements_summary=elements_summary)
-        update_status_in_database(document_id, ProcessingStatus.CHUNKING, {ProcessingStatus.PARTITIONING.value: {"elements_found": elements_summary}})
+        logger.info("partitioning_completed", document_id=document_id, elements_summary=elements_summary, **partition_details)
+        update_status_in_database(document_id, ProcessingStatus.CHUNKING, {ProcessingStatus.PARTITIONING.value: {"elements_found": elements_summary, **partition_details}})
 
         # Step 2 : Split the extracted content into chunks.
         chunks, chunking_metrics = chunk_elements_by_title(elements)
         logger.info("chunking_completed", document_id=document_id, total_chunks=chunking_metrics["total_chunks"])
-        update_status_in_database(document_id, ProcessingStatus.SUMMARISING, {ProcessingStatus.CHUNKING.value: chunking_metrics})
 
-        # Step 3 : Generate AI summaries for chunk which are Having images and tables.
-        processed_chunks = summarise_chunks(chunks, document_id)
-        logger.info("summarization_completed", document_id=document_id, chunks_count=len(processed_chunks))
-        update_status_in_database(document_id, ProcessingStatus.VECTORIZATION)
+        # Unstructured elements are not serialisable : keep only what the next steps need.
+        image_stats = {"kept": 0, "dropped": 0, "bytes_before": 0, "bytes_after": 0}
+        prepared_chunks = [prepare_chunk(chunk, i, source_type, image_stats) for i, chunk in enumerate(chunks)]
+        if image_stats["kept"] or image_stats["dropped"]:
+            # Repeated images (logos, headers, ...) are stored and summarised once, the fingerprints follow the new content.
+            image_stats.update(deduplicate_document_images(prepared_chunks, document["project_id"], document_id))
+            for prepared_chunk in prepared_chunks:
+                prepared_chunk["content_hash"] = compute_chunk_fingerprint(prepared_chunk["content_data"])
+            chunking_metrics = {**chunking_metrics, "images": image_stats}
+            logger.info("images_preprocessed", document_id=document_id, **image_stats)
+
+        chunk_diff = None
+        if incremental:
+            # Only chunks whose fingerprint is not stored yet go through the expensive steps.
+            chunk_diff = diff_chunks_against_database(prepared_chunks, document_id)
+            prepared_chunks = [prepared_chunks[i] for i in chunk_diff["new_chunk_indexes"]]
+            chunking_metrics = {
+                **chunking_metrics,
+                "new_chunks": len(chunk_diff["new_chunk_indexes"]),
+                "unchanged_chunks": len(chunk_diff["keep_chunk_ids"]),
+                "removed_chunks": chunk_diff["removed_chunks"],
+            }
+            logger.info("chunk_diff_completed", document_id=document_id, **{key: value for key, value in chunking_metrics.items() if key != "total_chunks"})
+
+        update_status_in_database(document_id, ProcessingStatus.CHUNKING, {ProcessingStatus.CHUNKING.value: chunking_metrics})
+
+        chunking_result = {
+            "project_id": document["project_id"],
+            "incremental": incremental,
+            "prepared_chunks": prepared_chunks,
+            "chunk_diff": chunk_diff,
+        }
+        save_stage_output(document_id, CHUNKS_STAGE, chunking_result)
+        return chunking_result
+    except Exception as e:
+        logger.error("document_processing_failed", document_id=document_id, error=str(e), exc_info=True)
+        raise Exception(f"Failed to process document {document_id}: {str(e)}")
+
+
+def summarise_vectorize_and_store_document(document_id: str, chunking_result: dict = None):
+    """
+    Network-bound stage : Step 3 (summarise) and Step 4 (embed + store) of the chunks prepared by partition_and_chunk_document,
+    then mark the document as completed and drop its checkpoints.
+    chunking_result=None loads it from the "chunks" checkpoint (Celery io worker).
+    """
+    if chunking_result is None:
+        chunking_result = load_stage_output(document_id, CHUNKS_STAGE)
+        if chunking_result is None:
+            raise Exception(f"Failed to process document {document_id}: no chunks checkpoint found")
+
+    set_project_id(chunking_result["project_id"])
+    incremental = chunking_result["incremental"]
+    prepared_chunks = chunking_result["prepared_chunks"]
+
+    try:
+        update_status_in_database(document_id, ProcessingStatus.SUMMARISING)
 
-        # Step 4 : Create vector embeddings (1536 dimensions per chunk).
-        chunk_ids = vectorize_chunks_summary_and_store_in_database(processed_chunks, document_id)
+        # Step 3 + 4 : Streaming pipeline - summarise -> embed -> store run at the same time, each stage in its own thread,
+        # connected by bounded buffers (memory stays bounded, total time ~ the slowest stage).
+        chunk_ids = run_summarise_vectorize_store_pipeline(prepared_chunks, document_id, chunking_result["project_id"])
         logger.info("vectorization_completed", document_id=document_id, stored_chunks=len(chunk_ids))
 
+        # The new chunks were stored uncommitted : swap them in for the previous version (if any) in one transaction.
+        sync_document_chunks(document_id, chunking_result["chunk_diff"] if incremental else None, chunk_ids)
+
         update_status_in_database(document_id, ProcessingStatus.COMPLETED)
-        logger.info("document_processing_completed", document_id=document_id, chunks_created=len(processed_chunks))
+        logger.info("document_processing_completed", document_id=document_id, chunks_created=len(chunk_ids))
+
+        try:
+            delete_stage_outputs(document_id)
+        except Exception as e:
+            logger.warning("stage_outputs_cleanup_failed", document_id=document_id, error=str(e))
 
-        return {"success": True, "document_id": document_id, "chunks_created": len(processed_chunks)}
+        return {"success": True, "document_id": document_id, "chunks_created": len(chunk_ids)}
     except Exception as e:
         logger.error("document_processing_failed", document_id=document_id, error=str(e), exc_info=True)
         raise Exception(f"Failed to process document {document_id}: {str(e)}")
 
 
+def run_summarise_vectorize_store_pipeline(prepared_chunks, document_id, project_id):
+    """
+    Step 3 (summarise) and Step 4 (embed + store) as overlapping stages:
+
+        summarise_chunks  --[PIPELINE_SUMMARISED_BUFFER chunks]-->  vectorize_chunks  --[PIPELINE_VECTORIZED_BUFFER rows]-->  store_chunks_in_database
+
+    The status stays "summarising" while summaries are still being generated and switches to "vectorization" once they are
+    all done; from then on the stored chunk count is reported as vectorization progress. Returns the stored chunk ids.
+    Summaries and embeddings are checkpointed while they stream by; those of a previous attempt are reused.
+    """
+    total_chunks = len(prepared_chunks)
+    summaries_checkpoint = StageCheckpoint(document_id, SUMMARIES_STAGE)
+    embeddings_checkpoint = StageCheckpoint(document_id, EMBEDDINGS_STAGE)
+    checkpointed_summaries = {processed_chunk["chunk_index"]: processed_chunk for processed_chunk in summaries_checkpoint.load()}
+    checkpointed_embeddings = {entry["key"]: unpack_embedding(base64.b64decode(entry["embedding"])) for entry in embeddings_checkpoint.load()}
+    summarising_done = threading.Event()
+    vectorization_reporter = ProgressReporter(document_id, ProcessingStatus.VECTORIZATION)
+    stored_chunks = {"count": 0}
+
+    def summarise_then_switch_status():
+        yield from summarise_chunks(prepared_chunks, document_id, project_id, checkpointed_summaries, summaries_checkpoint)
+        logger.info("summarization_completed", document_id=document_id, chunks_count=total_chunks)
+        summarising_done.set()
+        vectorization_reporter.report(stored_chunks["count"], total_chunks)
+
+    def report_stored_chunks(stored_count):
+        stored_chunks["count"] = stored_count
+        # While summaries are still running the status must stay "summarising".
+        if summarising_done.is_set():
+            vectorization_reporter.report(stored_count, total_chunks)
+
+    summarised_chunks = run_stage_in_background(summarise_then_switch_status(), PIPELINE_SUMMARISED_BUFFER)
+    vectorized_rows = run_stage_in_background(
+        vectorize_chunks(summarised_chunks, document_id, checkpointed_embeddings, embeddings_checkpoint), PIPELINE_VECTORIZED_BUFFER
+    )
+
+    try:
+        stored_chunk_ids = store_chunks_in_database(
+            vectorized_rows,
+            document_id,
+            total_chunks=total_chunks,
+            on_chunks_stored=report_stored_chunks,
+        )
+    except Exception as e:
+        logger.error("vectorization_and_storage_failed", document_id=document_id, error=str(e), exc_info=True)
+        raise Exception(f"Failed to summarise, vectorize and store chunks: {str(e)}")
+    finally:
+        vectorized_rows.close()  # Stops the upstream stages if storing failed.
+
+    vectorization_reporter.finish()
+    return stored_chunk_ids
+
+
+def mark_document_failed(document_id: str, error: str):
+    """Terminal status of a document whose ingestion failed for good. Best effort : the failure is already logged."""
+    try:
+        update_status_in_database(document_id, ProcessingStatus.FAILED, {ProcessingStatus.FAILED.value: {"error": error[:1000]}})
+    except Exception as e:
+        logger.warning("document_failed_status_update_failed", document_id=document_id, error=str(e))
+
+
 def update_status_in_database(
     document_id: str, status: ProcessingStatus, details: dict = None
 ):
     """
     Update the project document record with the new status and details.
+    The details are merged into processing_details on the server (single RPC, safe against concurrent updates).
     """
     logger.info(
         "updating_document_status",
@@ -78,79 +274,120 @@ def update_status_in_database(
         has_details=details is not None
     )
 
-    try:
-        # Get the project document record
-        document_result = (
-            supabase.table("project_documents")
-            .select("processing_details")
-            .eq("id", document_id)
-            .execute()
-        )
-        if not document_result.data:
-            logger.error(
-                "document_not_found",
-                document_id=document_id,
-                status=status.value
-            )
-            raise Exception(
-                f"Failed to get project document record with id: {document_id}"
-            )
+    attempt = 0
+    while True:
+        try:
+            # Note : update_document_processing_status() does `processing_details || details` - a top-level merge like dict.update().
+            document_update_result = supabase.rpc(
+                "update_document_processing_status",
+                {
+                    "target_document_id": document_id,
+                    "new_status": status.value,
+                    "new_details": details or {},
+                },
+            ).execute()
 
-        # Add processing details to the project document record if there are any
-        current_details = {}
-        if document_result.data[0]["processing_details"]:
-            current_details = document_result.data[0]["processing_details"]
-
-        # Add new details if provided
-        if details:
-            current_details.update(
-                details
-            )  # Note : update() - built-in dict method that merges another dictionary into the current one.
-            logger.debug(
-                "merged_processing_details",
+            if not document_update_result.data:
+                logger.error(
+                    "document_not_found",
+                    document_id=document_id,
+                    status=status.value
+                )
+                raise Exception(
+                    f"Failed to get project document record with id: {document_id}"
+                )
+
+            logger.info(
+                "document_status_updated_successfully",
                 document_id=document_id,
-                details_keys=list(details.keys())
+                status=status.value,
+                details_keys=list(details.keys()) if details else []
             )
+            # Every status / progress write doubles as the heartbeat of the document's ingestion slot (fair scheduler) :
+            # a long stage keeps its slot, a crashed worker stops renewing it.
+            if status not in (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED):
+                renew_ingestion_lease(document_id)
+            return
+
+        except Exception as e:
+            # Simple retry with exponential backoff - status transitions (e.g. "completed") must not get lost on a blip.
+            attempt += 1
+            if attempt >= 3:
+                logger.error(
+                    "update_status_error",
+                    document_id=document_id,
+                    status=status.value,
+                    error=str(e),
+                    exc_info=True
+                )
+                raise Exception(f"Failed to update status in database: {str(e)}")
+            wait_time = 2**attempt
+            logger.warning("update_status_retry", document_id=document_id, status=status.value, attempt=attempt, wait_seconds=wait_time)
+            time.sleep(wait_time)
 
-        # Update the project document record with the new details
-        document_update_result = (
-            supabase.table("project_documents")
-            .update(
-                {
-                    "processing_status": status.value,
-                    "processing_details": current_details,
-                }
-            )
-            .eq("id", document_id)
-            .execute()
-        )
 
-        if not document_update_result.data:
-            logger.error(
-                "status_update_failed",
-                document_id=document_id,
-                status=status.value
-            )
-            raise Exception(
-                f"Failed to update project document record with id: {document_id}"
-            )
+class ProgressReporter:
+    """
+    Coalesces per-item progress updates of one processing stage into a few status writes.
 
-        logger.info(
-            "document_status_updated_successfully",
-            document_id=document_id,
-            status=status.value,
-            details_count=len(current_details)
-        )
+    A write happens only when progress moved by at least `min_percent_step` or `max_interval_seconds` passed,
+    and never more often than every `min_interval_seconds`. Intermediate writes are best effort (logged, never raised);
+    finish() always writes the final state. Thread-safe, so it can be fed from worker threads.
 
-    except Exception as e:
-        logger.error(
-            "update_status_error",
-            document_id=document_id,
-            status=status.value,
-            error=str(e),
-            exc_info=True
-        )
-        raise Exception(f"Failed to update status in database: {str(e)}")
+    Usage:
+        reporter = ProgressReporter(document_id, ProcessingStatus.SUMMARISING)
+        reporter.report(current_chunk, total_chunks, {"failed_chunks": [...]})
+        reporter.finish()
+    """
+
+    def __init__(
+        self,
+        document_id: str,
+        status: ProcessingStatus,
+        min_interval_seconds: float = PROGRESS_MIN_INTERVAL_SECONDS,
+        max_interval_seconds: float = PROGRESS_MAX_INTERVAL_SECONDS,
+        min_percent_step: float = PROGRESS_MIN_PERCENT_STEP,
+    ):
+        self.document_id = document_id
+        self.status = status
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.min_percent_step = min_percent_step
+        self._lock = threading.Lock()
+        self._details = None
+        self._percent = 0.0
+        self._last_written_percent = None
+        self._last_written_at = 0.0
+
+    def report(self, current: int, total: int, extra: dict = None):
+        with self._lock:
+            self._details = {"current_chunk": current, "total_chunks": total, **(extra or {})}
+            self._percent = 100.0 * current / total if total else 100.0
+
+            now = time.monotonic()
+            elapsed = now - self._last_written_at
+            if self._last_written_percent is not None:
+                if elapsed < self.min_interval_seconds:
+                    return
+                moved = self._percent - self._last_written_percent
+                if moved <= 0 or (moved < self.min_percent_step and elapsed < self.max_interval_seconds):
+                    return
+
+            try:
+                self._write()
+            except Exception as e:
+                logger.warning("progress_update_skipped", document_id=self.document_id, status=self.status.value, error=str(e))
+
+    def finish(self):
+        """Write the latest reported state, even if it was throttled."""
+        with self._lock:
+            if self._details is not None and self._last_written_percent != self._percent:
+                self._write()
+
+    def _write(self):
+        update_status_in_database(self.document_id, self.status, {self.status.value: self._details})
+        self._last_written_percent = self._percent
+        self._last_written_at = time.monotonic()
 
 
 def download_content_and_partition(document_id: str, document: dict):
@@ -163,6 +400,7 @@ def download_content_and_partition(document_id: str, document: dict):
     try:
         document_source_type = document["source_type"]
         elements = None
+        partition_details = {}
         temp_file_path = None
 
         if document_source_type == "file":
@@ -173,7 +411,7 @@ def download_content_and_partition(document_id: str, document: dict):
             logger.info("downloading_from_s3", document_id=document_id, s3_key=s3_key, file_type=file_type)
             s3_client.download_file(appConfig["s3_bucket_name"], s3_key, temp_file_path)
             logger.info("s3_download_completed", document_id=document_id)
-            elements = partition_document(temp_file_path, file_type)
+            elements, partition_details = partition_document(temp_file_path, file_type)
 
         if document_source_type == "url":
             url = document["source_url"]
@@ -183,13 +421,13 @@ def download_content_and_partition(document_id: str, document: dict):
             with open(temp_file_path, "wb") as f:
                 f.write(response.content)
             logger.info("url_crawl_completed", document_id=document_id)
-            elements = partition_document(temp_file_path, "html", source_type="url")
+            elements, partition_details = partition_document(temp_file_path, "html", source_type="url")
 
         elements_summary = analyze_elements(elements)
         logger.info("elements_analyzed", document_id=document_id, elements_count=len(elements))
         os.remove(temp_file_path)
 
-        return elements_summary, elements
+        return elements_summary, elements, partition_details
 
     except Exception as e:
         logger.error("download_and_partition_failed", document_id=document_id, error=str(e), exc_info=True)
@@ -215,162 +453,387 @@ def chunk_elements_by_title(elements):
         raise Exception(f"Failed to chunk elements by title: {str(e)}")
 
 
-def summarise_chunks(chunks, document_id, source_type="file"):
+def summarise_chunks(prepared_chunks, document_id, project_id, checkpointed_summaries=None, checkpoint=None):
     """
     Create user-friendly, searchable chunks.
 
     For each chunk we optionally generate an AI summary (useful for mixed content like
     tables/images) and update the UI to better UX as each chunk will take at least 5 seconds to process.
+    Summaries run concurrently (at most `summary_max_concurrency` LLM calls in flight). This is a generator : processed
+    chunks are yielded in chunk order as soon as they are ready, so the embedding stage can start on the first ones.
+    checkpointed_summaries : chunk_index -> processed chunk of a previous attempt (not summarised again).
+    checkpoint : StageCheckpoint receiving every newly summarised chunk (not the ones whose summary failed).
     """
 
     try:
-        processed_chunks = []
-        total_chunks = len(chunks)
+        total_chunks = len(prepared_chunks)
+        checkpointed_summaries = checkpointed_summaries or {}
+        retried_chunks = []
+        failed_chunks = []
+        completed_chunks = 0
+        progress_reporter = ProgressReporter(document_id, ProcessingStatus.SUMMARISING)
+        max_in_flight = appConfig["summary_max_concurrency"] * 2  # Look-ahead bound : keeps the pool busy, memory bounded.
+
+        executor = ThreadPoolExecutor(max_workers=appConfig["summary_max_concurrency"])
+        try:
+            pending_futures = deque()
+            next_chunk = 0
+
+            while pending_futures or next_chunk < total_chunks:
+                while next_chunk < total_chunks and len(pending_futures) < max_in_flight:
+                    checkpointed_chunk = checkpointed_summaries.get(prepared_chunks[next_chunk]["chunk_index"])
+                    if checkpointed_chunk is not None:
+                        # Summarised by a previous attempt : attempts=0 marks it as not new.
+                        summary_future = Future()
+                        summary_future.set_result((checkpointed_chunk, 0, False))
+                    else:
+                        # copy_context() so the worker threads keep our logging context (request_id, project_id).
+                        summary_future = executor.submit(
+                            contextvars.copy_context().run, summarise_chunk, prepared_chunks[next_chunk], project_id
+                        )
+                    pending_futures.append(summary_future)
+                    next_chunk += 1
+
+                # Oldest future first = chunk order.
+                processed_chunk, attempts, failed = pending_futures.popleft().result()
+                completed_chunks += 1
+                # Chunks that fell back to their plain text are not checkpointed : a resume retries their summary.
+                if checkpoint and attempts and not failed:
+                    checkpoint.add(processed_chunk)
+                if attempts > 1:
+                    retried_chunks.append(processed_chunk["chunk_index"])
+                if failed:
+                    failed_chunks.append(processed_chunk["chunk_index"])
+
+                # Progress updates for the UI polling loop; keeps the user informed (throttled by the reporter).
+                progress_reporter.report(
+                    completed_chunks,
+                    total_chunks,
+                    {"retried_chunks": retried_chunks, "failed_chunks": failed_chunks},
+                )
 
-        for i, chunk in enumerate(chunks):
-            current_chunk = i + 1
+                yield processed_chunk
+        finally:
+            # Also reached when a later stage fails and closes this generator : drop the chunks not started yet.
+            executor.shutdown(wait=True, cancel_futures=True)
+            if checkpoint:
+                checkpoint.flush()
 
-            # Progress updates for the UI polling loop; keeps the user informed.
-            update_status_in_database(
-                document_id,
-                ProcessingStatus.SUMMARISING,
-                {
-                    ProcessingStatus.SUMMARISING.value: {
-                        "current_chunk": current_chunk,
-                        "total_chunks": total_chunks,
-                    },
-                },
-            )
+        progress_reporter.finish()
+
+        if checkpointed_summaries:
+            logger.info("summaries_reused_from_checkpoint", document_id=document_id, chunks=len(checkpointed_summaries))
+        if retried_chunks or failed_chunks:
+            logger.warning("summarization_had_errors", document_id=document_id, retried_chunks=retried_chunks, failed_chunks=failed_chunks)
+    except Exception as e:
+        raise Exception(f"Failed to summarise chunks: {str(e)}")
 
-            # Normalize the raw chunk into typed content buckets (text/tables/images, etc.).
-            # content_data = {
-            #     "text": "This is the main text content of the chunk...",
-            #     "tables": ["<table><tr><th>Header</th></tr><tr><td>Data</td></tr></table>"],
-            #     "images": ["iVBORw0KGgoAAAANSUhEUgAA..."],  # base64 encoded image strings
-            #     "types": ["text", "table", "image"]  # or ["text"], ["text", "table"], etc.
-            # }
-            content_data = separate_content_types(chunk, source_type)
-
-            # * Use AI summarization only when the chunk contains at least one table or image.
-            if content_data["tables"] or content_data["images"]:
+
+def prepare_chunk(chunk, chunk_index, source_type="file", image_stats=None):
+    """
+    Extract what Step 3 + 4 need from a raw chunk : its typed content (images preprocessed, see preprocess_chunk_images),
+    page number and content fingerprint.
+    """
+
+    # Normalize the raw chunk into typed content buckets (text/tables/images, etc.).
+    # content_data = {
+    #     "text": "This is the main text content of the chunk...",
+    #     "tables": ["<table><tr><th>Header</th></tr><tr><td>Data</td></tr></table>"],
+    #     "images": ["iVBORw0KGgoAAAANSUhEUgAA..."],  # base64 encoded image strings
+    #     "types": ["text", "table", "image"]  # or ["text"], ["text", "table"], etc.
+    # }
+    content_data = preprocess_chunk_images(separate_content_types(chunk, source_type), image_stats)
+    return {
+        "chunk_index": chunk_index,
+        "page_number": get_page_number(chunk, chunk_index),
+        "content_data": content_data,
+        "content_hash": compute_chunk_fingerprint(content_data),
+    }
+
+
+def summarise_chunk(prepared_chunk, project_id):
+    """
+    Turn one prepared chunk into a processed chunk. Runs inside the summarise_chunks thread pool.
+    Returns (processed_chunk, attempts, failed) - a chunk whose AI summary keeps failing falls back to its plain text.
+    Images are uploaded to the image store, the chunk row only keeps their keys.
+    """
+    content_data = prepared_chunk["content_data"]
+    chunk_index = prepared_chunk["chunk_index"]
+
+    enhanced_content = content_data["text"]
+    attempts = 0
+    failed = False
+
+    # * Use AI summarization only when the chunk contains at least one table or image.
+    if content_data["tables"] or content_data["images"]:
+        while True:
+            attempts += 1
+            try:
                 enhanced_content = create_ai_summary(
                     content_data["text"], content_data["tables"], content_data["images"]
                 )
-            else:
-                enhanced_content = content_data["text"]
-
-            # Preserve the original content structure for traceability in the UI.
-            original_content = {"text": content_data["text"]}
-            if content_data["tables"]:
-                original_content["tables"] = content_data["tables"]
-            if content_data["images"]:
-                original_content["images"] = content_data["images"]
-
-            # Assemble the final searchable unit with minimal but useful metadata.
-            processed_chunk = {
-                "content": enhanced_content,
-                "original_content": original_content,
-                "type": content_data["types"],
-                "page_number": get_page_number(chunk, i),
-                "char_count": len(enhanced_content),
-            }
+                break
+            except Exception as e:
+                if attempts >= SUMMARY_MAX_ATTEMPTS:
+                    # Keep the chunk searchable by its raw text instead of failing the whole document.
+                    logger.error("chunk_summary_failed", chunk_index=chunk_index, attempt=attempts, error=str(e))
+                    failed = True
+                    break
+                wait_time = 2**attempts
+                logger.warning("chunk_summary_retry", chunk_index=chunk_index, attempt=attempts, wait_seconds=wait_time, error=str(e))
+                time.sleep(wait_time)
+
+    # Preserve the original content structure for traceability in the UI.
+    original_content = {"text": content_data["text"]}
+    if content_data["tables"]:
+        original_content["tables"] = content_data["tables"]
+    if content_data["images"]:
+        original_content["image_keys"] = [store_image(project_id, image) for image in content_data["images"]]
+    # Deduplicated images : references to the chunk storing them / boilerplate stored once (see deduplicate_document_images).
+    if content_data.get("image_refs"):
+        original_content["image_refs"] = content_data["image_refs"]
+    if content_data.get("boilerplate_images"):
+        original_content["boilerplate_image_keys"] = [store_image(project_id, image) for image in content_data["boilerplate_images"]]
+
+    # Assemble the final searchable unit with minimal but useful metadata.
+    processed_chunk = {
+        "content": enhanced_content,
+        "original_content": original_content,
+        "type": content_data["types"],
+        "page_number": prepared_chunk["page_number"],
+        "char_count": len(enhanced_content),
+        "chunk_index": chunk_index,
+        "content_hash": prepared_chunk["content_hash"],
+    }
+
+    # Rough example for processed_chunk:
+    # {
+    #     "content": "AI-enhanced summary of the chunk... Image looks like this: <image_base64> ... Table looks like this: <table_html> ...",
+    #     "original_content": {
+    #         "text": "Full paragraph of the chunk...",
+    #         "tables": ["<table><tr><th>Region</th><th>Revenue</th></tr><tr><td>APAC</td><td>$1.2M</td></tr></table>"],
+    #         "image_keys": ["projects/<project_id>/images/<sha256>.jpg"]
+    #     },
+    #     "type": ["text", "table", "image"],
+    #     "page_number": 3,
+    #     "char_count": 142,
+    #     "chunk_index": 7,
+    #     "content_hash": "9f2c..."  # sha256 of text/tables/images, used by incremental re-ingestion
+    # }
+
+    return processed_chunk, attempts, failed
+
+
+def vectorize_chunks(processed_chunks, document_id, checkpointed_embeddings=None, checkpoint=None):
+    """
+    Embed the ai-summary of the processed chunks batch by batch and yield the chunk rows ready to be stored.
+    Generator : a request is sent as soon as a token-packed batch of processed chunks arrived.
+    checkpointed_embeddings : embedding_cache_key(text) -> embedding of a previous attempt (not embedded again).
+    checkpoint : StageCheckpoint receiving every newly generated embedding.
+    """
 
-            # Rough example for processed_chunk:
-            # {
-            #     "content": "AI-enhanced summary of the chunk... Image looks like this: <image_base64> ... Table looks like this: <table_html> ...",
-            #     "original_content": {
-            #         "text": "Full paragraph of the chunk...",
-            #         "tables": ["<table><tr><th>Region</th><th>Revenue</th></tr><tr><td>APAC</td><td>$1.2M</td></tr></table>"],
-            #         "images": ["iVBORw0KGgoAAA...base64..."]
-            #     },
-            #     "type": ["text", "table", "image"],
-            #     "page_number": 3,
-            #     "char_count": 142
-            # }
-
-            processed_chunks.append(processed_chunk)
-
-        return processed_chunks
-    except Exception as e:
-        raise Exception(f"Failed to summarise chunks: {str(e)}")
+    # processed_chunks example (list / stream of dicts):
+
+    # processed chunks = [{
+    #     "content": "Ai-enhanced summary of the chunk...", <----- **This is the content that will be vectorized.**
+    #     "original_content": {"text": "...", "tables": ["<table...>"], "images": ["<base64>"]},
+    #     "type": ["text", "table", "image"],
+    #     "page_number": 3,
+    #     "char_count": 142,
+    #     "chunk_index": 0,
+    #     "content_hash": "9f2c..."
+    # }, {....}]
+
+    # Requests are packed by token count and run concurrently; the batcher backs off on 429s (see EmbeddingBatcher).
+    embedding_batcher = EmbeddingBatcher()
+    checkpointed_embeddings = checkpointed_embeddings or {}
+    pending_batches = deque()
+    batch_num = 0
+    cache_hits = 0
+    logger.info("vectorization_started", document_id=document_id, max_tokens_per_request=embedding_batcher.max_tokens, max_concurrency=embedding_batcher.max_concurrency)
 
+    try:
+        for batch_chunks in embedding_batcher.pack(processed_chunks, get_text=lambda chunk: chunk["content"]):
+            batch_num += 1
+            ai_summary_list = [chunk["content"] for chunk in batch_chunks]
+            # ai_summary_list = ["Ai-enhanced summary of the chunk...", "Ai-enhanced summary of the chunk...", ...]
+
+            # Reuse embeddings of text we have embedded before (re-uploads, duplicate files, boilerplate chunks).
+            cached_embeddings = get_cached_embeddings(ai_summary_list)
+            if checkpointed_embeddings:
+                cached_embeddings = [
+                    embedding if embedding is not None else checkpointed_embeddings.get(embedding_cache_key(text))
+                    for text, embedding in zip(ai_summary_list, cached_embeddings)
+                ]
+            texts_to_embed = list({text for text, embedding in zip(ai_summary_list, cached_embeddings) if embedding is None})
+            cache_hits += len(ai_summary_list) - len(texts_to_embed)
+
+            pending_batches.append((batch_num, batch_chunks, cached_embeddings, texts_to_embed, embedding_batcher.submit(texts_to_embed)))
+
+            # Hand over finished batches in order, and never keep more requests in flight than the (adaptive) limit.
+            while pending_batches and (pending_batches[0][-1].done() or len(pending_batches) >= embedding_batcher.concurrency_limit):
+                yield from build_chunk_rows(pending_batches.popleft(), document_id, checkpoint)
+
+        while pending_batches:
+            yield from build_chunk_rows(pending_batches.popleft(), document_id, checkpoint)
+    finally:
+        embedding_batcher.shutdown()
+        if checkpoint:
+            checkpoint.flush()
+
+    logger.info("vectorization_completed", document_id=document_id, batches=batch_num, cache_hits=cache_hits)
+
+
+def build_chunk_rows(pending_batch, document_id, checkpoint=None):
+    """Wait for an embedding request of vectorize_chunks and yield its chunk rows (processed chunk + embedding)."""
+    batch_num, batch_chunks, cached_embeddings, texts_to_embed, embeddings_future = pending_batch
+    try:
+        embeddings = embeddings_future.result()
+    except Exception as e:
+        logger.error("vectorization_batch_failed", document_id=document_id, batch=batch_num, error=str(e), exc_info=True)
+        raise e
+
+    if texts_to_embed:
+        set_cached_embeddings(texts_to_embed, embeddings)
+        if checkpoint:
+            for text, embedding in zip(texts_to_embed, embeddings):
+                # float32 packed + base64 : ~8KB per embedding instead of ~30KB as a JSON float list.
+                checkpoint.add({"key": embedding_cache_key(text), "embedding": base64.b64encode(pack_embedding(embedding)).decode("ascii")})
+        logger.info("batch_vectorized", document_id=document_id, batch=batch_num, chunks_in_batch=len(texts_to_embed))
+
+    # Fill the cache misses (in chunk order) with the freshly generated embeddings.
+    new_embeddings = dict(zip(texts_to_embed, embeddings))
+
+    # Add document_id and embedding to each processed_chunk
+    # chunk_data_with_embedding example:
+    # {
+    #     * Same as above but added document_id and embedding.
+    #     "content": "AI-enhanced summary of the chunk...","original_content": {"text": "...", "tables": ["<table>...</table>"], "images": ["<base64>"]},"type": ["text", "table", "image"],"page_number": 3,"char_count": 142,"chunk_index": 0,"content_hash": "9f2c...",
+    #     "document_id": "doc_123",
+    #     "embedding": [0.123, -0.456, 0.789, 0.234, ...]  # 1536 dimensions
+    # }
+    for processed_chunk, cached_embedding in zip(batch_chunks, cached_embeddings):
+        embedding_vector = cached_embedding if cached_embedding is not None else new_embeddings[processed_chunk["content"]]
+        yield {**processed_chunk, "document_id": document_id, "embedding": embedding_vector, "committed": False}
+
+
+def store_chunks_in_database(chunk_rows, document_id, total_chunks=None, on_chunks_stored=None):
+    """
+    Bulk insert the chunk rows of a document in size-bounded multi-row batches (one PostgREST call per batch).
+    chunk_rows can be a stream : each batch is inserted as soon as it is full.
+
+    All or nothing : PostgREST cannot hold a transaction open across requests, so if any batch fails after its retries
+    (or the stream feeding us fails) we delete the chunks stored by this call again (compensating rollback).
+    The rows are stored uncommitted (not searchable) : sync_document_chunks commits them once every row is stored,
+    until then the previous version of the document (if any) stays searchable.
+    on_chunks_stored(stored_count) is called after every stored batch (progress reporting).
+    """
+    # Retried task : drop uncommitted rows left over by a previous attempt so we never store the same chunk twice.
+    supabase.table("document_chunks").delete().eq("document_id", document_id).eq("committed", False).execute()
 
-def vectorize_chunks_summary_and_store_in_database(processed_chunks, document_id):
-    """Generate vector embeddings of the ai-summary of the chunks and store in the database."""
+    stored_chunk_ids = []
+    logger.info("storing_chunks_started", document_id=document_id, total_chunks=total_chunks)
 
     try:
-        # processed_chunks example (list of dicts):
-
-        # processed chunks = [{
-        #     "content": "Ai-enhanced summary of the chunk...", <----- **This is the content that will be vectorized.**
-        #     "original_content": {"text": "...", "tables": ["<table...>"], "images": ["<base64>"]},
-        #     "type": ["text", "table", "image"],
-        #     "page_number": 3,
-        #     "char_count": 142
-        # }, {....}]
-        # Step 1 : Vectorizing Chunks
-        ai_summary_list = [chunk["content"] for chunk in processed_chunks]
-        # ai_summary_list = ["Ai-enhanced summary of the chunk...", "Ai-enhanced summary of the chunk...", ...]
-
-        # Edge case : More chunks < More API calls. In Case we exceed the API limit. We will generate in batches.
-        batch_size = 10
-        all_vectorized_embeddings = []
-        logger.info("vectorization_started", document_id=document_id, total_chunks=len(ai_summary_list), batch_size=batch_size)
-
-        for start in range(0, len(ai_summary_list), batch_size):
-
-            # Splits into chunks of batch_size - 10
-            end = start + batch_size
-            batch_texts = ai_summary_list[start:end]
-            batch_num = (start // batch_size) + 1
-            total_batches = (len(ai_summary_list) + batch_size - 1) // batch_size
-
-            # Simple retry with exponential backoff
+        batches = build_insert_batches(chunk_rows, max_rows=INSERT_BATCH_MAX_ROWS, max_bytes=INSERT_BATCH_MAX_BYTES)
+        for batch_num, batch_rows in enumerate(batches, start=1):
             attempt = 0
             while True:
                 try:
-                    embeddings = openAI["embeddings"].embed_documents(batch_texts)
-                    all_vectorized_embeddings.extend(embeddings)  # 'extend' - built-in list method that adds multiple elements to the end of the list.
-                    logger.info("batch_vectorized", document_id=document_id, batch=f"{batch_num}/{total_batches}", chunks_in_batch=len(batch_texts))
+                    result = supabase.table("document_chunks").insert(batch_rows).execute()
+                    if len(result.data or []) != len(batch_rows):
+                        raise Exception(f"Inserted {len(result.data or [])} of {len(batch_rows)} chunks")
+                    stored_chunk_ids.extend(row["id"] for row in result.data)
+                    logger.info("batch_stored", document_id=document_id, batch=batch_num, chunks_in_batch=len(batch_rows), stored_chunks=len(stored_chunk_ids))
                     break
                 except Exception as e:
                     attempt += 1
                     if attempt >= 3:
-                        logger.error("vectorization_batch_failed", document_id=document_id, batch=batch_num, attempt=attempt, error=str(e), exc_info=True)
+                        logger.error("storage_batch_failed", document_id=document_id, batch=batch_num, attempt=attempt, error=str(e), exc_info=True)
                         raise e
                     wait_time = 2**attempt
-                    logger.warning("vectorization_retry", document_id=document_id, batch=batch_num, attempt=attempt, wait_seconds=wait_time)
+                    logger.warning("storage_retry", document_id=document_id, batch=batch_num, attempt=attempt, wait_seconds=wait_time)
                     time.sleep(wait_time)
 
-        # Step 2 : Storing Chunks with Embeddings
-        # chunk_embedding_pairs: list of tuples (processed_chunk, embedding_vector)
-        # Example:
-        # [
-        #     ({"content": "...", "page_number": 1, "type": ["text"]}, [0.123, -0.456, 0.789, ...]),
-        #     ({"content": "...", "page_number": 2, "type": ["text", "table"]}, [0.234, -0.567, 0.890, ...]),
-        #     ...
-        # ]
-        chunk_embedding_pairs = list(zip(processed_chunks, all_vectorized_embeddings))
-        stored_chunk_ids = []
-        logger.info("storing_chunks_started", document_id=document_id, total_chunks=len(chunk_embedding_pairs))
-
-        for i, (processed_chunk, embedding_vector) in enumerate(chunk_embedding_pairs):
-            # Add document_id, chunk_index, and embedding to each processed_chunk
-            # chunk_data_with_embedding example:
-            # {
-            #     * Same as above but added document_id, chunk_index, and embedding.
-            #     "content": "AI-enhanced summary of the chunk...","original_content": {"text": "...", "tables": ["<table>...</table>"], "images": ["<base64>"]},"type": ["text", "table", "image"],"page_number": 3,"char_count": 142,
-            #     "document_id": "doc_123",
-            #     "chunk_index": 0,
-            #     "embedding": [0.123, -0.456, 0.789, 0.234, ...]  # 1536 dimensions
-            # }
-            chunk_data_with_embedding = {**processed_chunk, "document_id": document_id, "chunk_index": i, "embedding": embedding_vector}
-            result = supabase.table("document_chunks").insert(chunk_data_with_embedding).execute()
-            stored_chunk_ids.append(result.data[0]["id"])
-
-        logger.info("chunks_stored_successfully", document_id=document_id, stored_count=len(stored_chunk_ids))
-        return stored_chunk_ids
+            if on_chunks_stored:
+                on_chunks_stored(len(stored_chunk_ids))
+    except Exception as e:
+        logger.warning("rolling_back_stored_chunks", document_id=document_id, stored_count=len(stored_chunk_ids))
+        delete_chunks_by_id(stored_chunk_ids)
+        raise Exception(f"Failed to store chunks, rolled back {len(stored_chunk_ids)} stored chunks: {str(e)}")
+
+    return stored_chunk_ids
+
+
+def delete_chunks_by_id(chunk_ids, batch_size=100):
+    """Delete chunks by id, in batches so the `id=in.(...)` filter stays within URL length limits."""
+    for start in range(0, len(chunk_ids), batch_size):
+        supabase.table("document_chunks").delete().in_("id", chunk_ids[start:start + batch_size]).execute()
 
+
+def diff_chunks_against_database(prepared_chunks, document_id):
+    """
+    Match the new (prepared) chunks of a document against its stored chunks by content fingerprint.
+    Identical chunks (e.g. repeated boilerplate) are matched one to one, so duplicates are counted correctly.
+
+    Returns {
+        "new_chunk_indexes": [3, 4],                 # positions of chunks that must be summarised / embedded / inserted
+        "keep_chunk_ids": ["uuid", ...],             # stored chunks that stay as they are ...
+        "keep_chunk_indexes": [0, 1, 2],             # ... at their new position
+        "keep_page_numbers": [1, 1, 2],
+        "removed_chunks": 1,                         # stored chunks that have no counterpart anymore
+    }
+    """
+    existing_chunks_result = (
+        supabase.table("document_chunks")
+        .select("id, content_hash")
+        .eq("document_id", document_id)
+        .eq("committed", True)
+        .order("chunk_index")
+        .execute()
+    )
+
+    # content_hash -> stored chunk ids with that content (older rows without a hash never match and get replaced).
+    stored_ids_by_hash = {}
+    for stored_chunk in existing_chunks_result.data or []:
+        if stored_chunk.get("content_hash"):
+            stored_ids_by_hash.setdefault(stored_chunk["content_hash"], []).append(stored_chunk["id"])
+
+    chunk_diff = {"new_chunk_indexes": [], "keep_chunk_ids": [], "keep_chunk_indexes": [], "keep_page_numbers": []}
+    for prepared_chunk in prepared_chunks:
+        matching_ids = stored_ids_by_hash.get(prepared_chunk["content_hash"])
+        if matching_ids:
+            chunk_diff["keep_chunk_ids"].append(matching_ids.pop(0))
+            chunk_diff["keep_chunk_indexes"].append(prepared_chunk["chunk_index"])
+            chunk_diff["keep_page_numbers"].append(prepared_chunk["page_number"])
+        else:
+            chunk_diff["new_chunk_indexes"].append(prepared_chunk["chunk_index"])
+
+    chunk_diff["removed_chunks"] = len(existing_chunks_result.data or []) - len(chunk_diff["keep_chunk_ids"])
+    return chunk_diff
+
+
+def sync_document_chunks(document_id, chunk_diff, new_chunk_ids):
+    """
+    Commit the newly stored chunks, delete removed chunks and renumber kept ones in one transaction (sync_document_chunks RPC).
+    chunk_diff=None (full ingestion) keeps nothing : every chunk of the previous version is removed.
+    If that fails, the freshly inserted chunks are deleted again so the document keeps its previous version.
+    """
+    chunk_diff = chunk_diff or {"keep_chunk_ids": [], "keep_chunk_indexes": [], "keep_page_numbers": []}
+    try:
+        sync_result = supabase.rpc(
+            "sync_document_chunks",
+            {
+                "target_document_id": document_id,
+                "keep_chunk_ids": chunk_diff["keep_chunk_ids"],
+                "keep_chunk_indexes": chunk_diff["keep_chunk_indexes"],
+                "keep_page_numbers": chunk_diff["keep_page_numbers"],
+                "new_chunk_ids": new_chunk_ids,
+            },
+        ).execute()
     except Exception as e:
-        logger.error("vectorization_and_storage_failed", document_id=document_id, error=str(e), exc_info=True)
-        raise Exception(f"Failed to vectorize chunks and store in database: {str(e)}")
+        logger.error("document_chunks_sync_failed", document_id=document_id, error=str(e), exc_info=True)
+        delete_chunks_by_id(new_chunk_ids)
+        raise Exception(f"Failed to sync document chunks: {str(e)}")
+
+    logger.info("document_chunks_synced", document_id=document_id, **(sync_result.data[0] if sync_result.data else {}))
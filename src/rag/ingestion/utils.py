@@ -5,41 +5,56 @@ from unstructured.partition.pptx import partition_pptx
 from unstructured.partition.text import partition_text
 from unstructured.partition.md import partition_md
 
+import io
+import os
+import gzip
+import base64
+import uuid
+import time
+import json
+import hashlib
+import queue
+import zipfile
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+import openai
+import tiktoken
+from pypdf import PdfReader, PdfWriter
+from PIL import Image
+
 from src.services.llm import openAI
+from src.services.redis import redis_client
+from src.services.awsS3 import s3_client
+from src.config.index import appConfig
+from src.config.logging import get_logger
 from langchain_core.messages import HumanMessage
 
+logger = get_logger(__name__)
+
 
 def partition_document(temp_file: str, file_type: str, source_type: str = "file"):
-    """Partition document based on file type and source type"""
+    """
+    Partition document based on file type and source type.
+    Returns (elements, partition_details) - partition_details records the strategy used, per page range for PDFs.
+    """
 
     source = (source_type or "file").lower()
     if source == "url":
         return partition_html(
             filename=temp_file,
-        )
+        ), {}
 
     kind = (file_type or "").lower()
     dispatch = {
-        "pdf": lambda: partition_pdf(
-            filename=temp_file,
-            strategy="hi_res",  # Most accurate (but slower) processing method of extraction.
-            infer_table_structure=True,  # Keep tables as structured HTML, not jumbled text.
-            extract_image_block_types=["Image"],  # Grab images found in pdf.
-            extract_image_block_to_payload=True,  # Store images as base64 strings in the payload.
-        ),
-        "docx": lambda: partition_docx(
-            filename=temp_file,
-            strategy="hi_res",
-            infer_table_structure=True,
-            # ! Note : We haven't implemented image extraction for docx,pptx ,md files.
-        ),
-        "pptx": lambda: partition_pptx(
-            filename=temp_file,
-            strategy="hi_res",
-            infer_table_structure=True,
-        ),
-        "txt": lambda: partition_text(filename=temp_file),
-        "md": lambda: partition_md(filename=temp_file),
+        "pdf": lambda: partition_pdf_in_parallel(temp_file),
+        "docx": lambda: partition_office_document(partition_docx, temp_file, "word/media/"),
+        "pptx": lambda: partition_office_document(partition_pptx, temp_file, "ppt/media/"),
+        "txt": lambda: (partition_text(filename=temp_file), {}),
+        "md": lambda: (partition_md(filename=temp_file), {}),
     }
 
     if kind not in dispatch:
@@ -48,6 +63,182 @@ def partition_document(temp_file: str, file_type: str, source_type: str = "file"
     return dispatch[kind]()
 
 
+def partition_office_document(partition_function, temp_file: str, media_folder: str):
+    """
+    docx / pptx have a real text layer and structural tables, hi_res only pays off for embedded images.
+    Checking the zip listing for a media folder is enough to decide.
+    """
+    with zipfile.ZipFile(temp_file) as office_file:
+        has_media = any(name.startswith(media_folder) for name in office_file.namelist())
+    strategy = "hi_res" if has_media else "fast"
+
+    elements = partition_function(
+        filename=temp_file,
+        strategy=strategy,
+        infer_table_structure=True,
+        # ! Note : We haven't implemented image extraction for docx,pptx ,md files.
+    )
+    return elements, {"strategy": strategy}
+
+
+PDF_PARTITION_OPTIONS = {
+    "hi_res": {
+        "strategy": "hi_res",  # Most accurate (but slower) processing method of extraction.
+        "infer_table_structure": True,  # Keep tables as structured HTML, not jumbled text.
+        "extract_image_block_types": ["Image"],  # Grab images found in pdf.
+        "extract_image_block_to_payload": True,  # Store images as base64 strings in the payload.
+    },
+    "fast": {
+        "strategy": "fast",  # Reads the embedded text layer directly, no layout detection / OCR.
+    },
+}
+
+# Page inspection thresholds of select_pdf_page_strategies.
+PAGE_MIN_TEXT_CHARS = 50  # Less text than this = scanned page (no usable text layer), needs OCR.
+PAGE_MIN_TABLE_LIKE_LINES = 3  # This many lines of mostly numbers look like a table.
+
+
+def select_pdf_page_strategies(reader: PdfReader):
+    """
+    Cheaply inspect each page (text layer + XObject listing, no rendering) and pick its partition strategy.
+    Only pages with images, table-like content or no text layer need hi_res; plain text pages use fast.
+    Returns a list of strategies, index 0 = page 1.
+    """
+    page_strategies = []
+
+    for page in reader.pages:
+        try:
+            page_text = page.extract_text() or ""
+            needs_hi_res = (
+                len(page_text.strip()) < PAGE_MIN_TEXT_CHARS
+                or pdf_page_has_images(page)
+                or count_table_like_lines(page_text) >= PAGE_MIN_TABLE_LIKE_LINES
+            )
+        except Exception:
+            # If we cannot inspect the page, be safe and use the accurate strategy.
+            needs_hi_res = True
+
+        page_strategies.append("hi_res" if needs_hi_res else "fast")
+
+    return page_strategies
+
+
+def pdf_page_has_images(page) -> bool:
+    """Whether the page's resources reference an image XObject (one level of form XObjects deep)."""
+    resources = page.get("/Resources")
+    if resources is None:
+        return False
+    x_objects = resources.get_object().get("/XObject")
+    if x_objects is None:
+        return False
+
+    for x_object in x_objects.get_object().values():
+        x_object = x_object.get_object()
+        subtype = x_object.get("/Subtype")
+        if subtype == "/Image":
+            return True
+        if subtype == "/Form" and x_object.get("/Resources") is not None:
+            form_x_objects = x_object["/Resources"].get_object().get("/XObject")
+            if form_x_objects is not None and any(
+                nested.get_object().get("/Subtype") == "/Image" for nested in form_x_objects.get_object().values()
+            ):
+                return True
+
+    return False
+
+
+def count_table_like_lines(page_text: str) -> int:
+    """Lines with 3+ numeric cells (numbers, amounts, percentages) - a cheap hint that the page holds a table."""
+    table_like_lines = 0
+    for line in page_text.splitlines():
+        numeric_cells = [token for token in line.split() if token.strip("$€£%(),.-+").replace(",", "").replace(".", "").isdigit()]
+        if len(numeric_cells) >= 3:
+            table_like_lines += 1
+    return table_like_lines
+
+
+def group_pages_into_ranges(page_strategies, pages_per_partition: int):
+    """
+    Consecutive pages sharing a strategy become one range, long runs are cut every pages_per_partition pages.
+    [hi_res, hi_res, fast, fast, fast] -> [(1, 2, "hi_res"), (3, 5, "fast")]
+    """
+    page_ranges = []
+    for page_number, strategy in enumerate(page_strategies, start=1):
+        if page_ranges:
+            first_page, last_page, range_strategy = page_ranges[-1]
+            if range_strategy == strategy and last_page - first_page + 1 < pages_per_partition:
+                page_ranges[-1] = (first_page, page_number, strategy)
+                continue
+        page_ranges.append((page_number, page_number, strategy))
+    return page_ranges
+
+
+def partition_pdf_in_parallel(temp_file: str):
+    """
+    Partition a PDF page range by page range in a process pool (hi_res partitioning is CPU-bound and single-core).
+
+    Every page gets its own strategy (see select_pdf_page_strategies), consecutive pages with the same strategy are
+    grouped into ranges of at most `pdf_pages_per_partition` pages, each range is partitioned in its own process with
+    `starting_page_number` set, and the elements are merged back in page order - so page_number metadata, chunk_by_title
+    and get_page_number behave exactly as with a single partition_pdf call.
+    A single range, or a daemon process (e.g. Celery prefork children, which cannot have children), partitions serially.
+    Returns (elements, {"page_strategies": {"hi_res": [[first_page, last_page], ...], "fast": [...]}}).
+    """
+    reader = PdfReader(temp_file)
+    page_strategies = select_pdf_page_strategies(reader)
+    page_ranges = group_pages_into_ranges(page_strategies, max(1, appConfig["pdf_pages_per_partition"]))
+    max_workers = appConfig["pdf_partition_workers"]
+
+    partition_details = {"page_strategies": {}}
+    for first_page, last_page, strategy in page_ranges:
+        partition_details["page_strategies"].setdefault(strategy, []).append([first_page, last_page])
+    logger.info("pdf_page_strategies_selected", page_count=len(page_strategies), hi_res_pages=page_strategies.count("hi_res"), fast_pages=page_strategies.count("fast"))
+
+    if len(page_ranges) == 1:
+        return partition_pdf(filename=temp_file, **PDF_PARTITION_OPTIONS[page_ranges[0][2]]), partition_details
+
+    first_pages, last_pages, strategies = zip(*page_ranges)
+
+    if max_workers <= 1 or multiprocessing.current_process().daemon:
+        page_range_elements = map(partition_pdf_pages, repeat(temp_file), first_pages, last_pages, strategies)
+        return [element for range_elements in page_range_elements for element in range_elements], partition_details
+
+    logger.info("parallel_pdf_partitioning_started", page_count=len(page_strategies), page_ranges=len(page_ranges), max_workers=max_workers)
+
+    # "spawn" : forking a multi-threaded Celery worker can deadlock the children.
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(page_ranges)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        # executor.map() yields results in submission order, i.e. page order.
+        page_range_elements = executor.map(partition_pdf_pages, repeat(temp_file), first_pages, last_pages, strategies)
+        elements = [element for range_elements in page_range_elements for element in range_elements]
+
+    return elements, partition_details
+
+
+def partition_pdf_pages(temp_file: str, first_page: int, last_page: int, strategy: str = "hi_res"):
+    """Partition pages first_page..last_page (1-based, inclusive) of a PDF. Runs inside a partition_pdf_in_parallel worker process."""
+    page_range_file = f"{temp_file}.pages-{first_page}-{last_page}.pdf"
+
+    reader = PdfReader(temp_file)
+    writer = PdfWriter()
+    for page_index in range(first_page - 1, last_page):
+        writer.add_page(reader.pages[page_index])
+    with open(page_range_file, "wb") as f:
+        writer.write(f)
+
+    try:
+        return partition_pdf(
+            filename=page_range_file,
+            metadata_filename=temp_file,  # Elements should point to the original file, not the page range copy.
+            starting_page_number=first_page,  # Keeps page_number metadata absolute.
+            **PDF_PARTITION_OPTIONS[strategy],
+        )
+    finally:
+        os.remove(page_range_file)
+
+
 def analyze_elements(elements):
     """Analyze the elements and return the summary"""
 
@@ -134,6 +325,277 @@ def separate_content_types(chunk, source_type="file"):
     return content_data
 
 
+def preprocess_chunk_images(content_data, image_stats=None):
+    """
+    Image preprocessing stage (before the vision summaries) : drop icons / blank images, downscale and re-encode the rest.
+    Updates content_data["images"] / ["types"] in place and adds the counters to image_stats if given
+    ({"kept": 0, "dropped": 0, "bytes_before": 0, "bytes_after": 0}).
+    """
+    if not content_data["images"]:
+        return content_data
+
+    processed_images = []
+    for image_base64 in content_data["images"]:
+        processed_image = preprocess_image(image_base64)
+        if processed_image is not None:
+            processed_images.append(processed_image)
+        if image_stats is not None:
+            image_stats["kept" if processed_image is not None else "dropped"] += 1
+            image_stats["bytes_before"] += len(image_base64)
+            image_stats["bytes_after"] += len(processed_image or "")
+
+    content_data["images"] = processed_images
+    if not processed_images:
+        # No image left : the chunk is not "image-bearing" anymore and may skip the vision summary.
+        content_data["types"] = [content_type for content_type in content_data["types"] if content_type != "image"]
+    return content_data
+
+
+def preprocess_image(image_base64: str):
+    """
+    Returns the image re-encoded as a compact base64 JPEG (longest side at most `image_max_dimension`),
+    or None when it carries no information worth a vision call :
+      - smaller than `image_min_dimension` on a side (icons, bullets, separators)
+      - grayscale entropy below `image_min_entropy` (blank / solid-colour areas)
+    Images that cannot be decoded are kept as they are.
+    """
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+        image.load()
+    except Exception as e:
+        logger.warning("image_decode_failed", error=str(e))
+        return image_base64
+
+    original_format, original_size = image.format, image.size
+
+    if min(image.size) < appConfig["image_min_dimension"]:
+        return None
+    if image.convert("L").entropy() < appConfig["image_min_entropy"]:
+        return None
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG has no alpha channel : flatten on white (transparent PNG backgrounds would turn black).
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    # thumbnail() keeps the aspect ratio and never upscales.
+    max_dimension = appConfig["image_max_dimension"]
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=appConfig["image_jpeg_quality"], optimize=True)
+    processed_image = base64.b64encode(output.getvalue()).decode("ascii")
+
+    # Re-encoding an already compact JPEG can make it bigger : keep the original then.
+    if original_format == "JPEG" and image.size == original_size and len(processed_image) >= len(image_base64):
+        return image_base64
+    return processed_image
+
+
+def choose_image_detail(image_base64: str) -> str:
+    """
+    Vision `detail` level of an image : "low" (fixed ~85 tokens, model sees it at 512px) when the image is not bigger
+    than that anyway, "high" (tiled, needed to read charts / small text) otherwise.
+    """
+    try:
+        width, height = Image.open(io.BytesIO(base64.b64decode(image_base64))).size
+    except Exception:
+        return "auto"
+    return "low" if max(width, height) <= appConfig["image_low_detail_max_dimension"] else "high"
+
+
+def compute_image_dhash(image_base64: str):
+    """64-bit difference hash (dHash) : near-identical images (re-encoded, slightly resized) get hashes a few bits apart."""
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(image_base64))).convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    except Exception as e:
+        logger.warning("image_hash_failed", error=str(e))
+        return None
+    pixels = list(image.getdata())
+    dhash = 0
+    for row in range(8):
+        for column in range(8):
+            dhash = (dhash << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return dhash
+
+
+def find_similar_image_hash(dhash: int, known_hashes, max_distance: int):
+    """First hash of known_hashes within max_distance bits of dhash (Hamming distance), or None."""
+    for known_hash in known_hashes:
+        if bin(dhash ^ known_hash).count("1") <= max_distance:
+            return known_hash
+    return None
+
+
+def deduplicate_document_images(prepared_chunks, project_id: str = None, document_id: str = None):
+    """
+    Perceptual-hash dedup of the images of a document (prepared chunks in document order, content_data updated in place).
+
+    Images are grouped by dHash (at most `image_dedup_max_distance` bits apart), then per group :
+      - boilerplate (in at least `image_boilerplate_min_chunks` chunks, e.g. logos and page headers, or - with
+        `image_dedup_project_scope` - in at least `image_boilerplate_min_documents` documents of the project) : stored once,
+        in content_data["boilerplate_images"] of its first chunk, never summarised nor sent as retrieval context.
+      - otherwise : stored and summarised once in its first chunk, later chunks only keep a reference to it in
+        content_data["image_refs"] = [{"chunk_index": 3, "image_index": 0}] (resolved at retrieval).
+    A chunk stays "image-bearing" (vision summary) only with images of its own.
+    Returns {"unique_images", "duplicate_images", "boilerplate_images"}.
+    """
+    max_distance = appConfig["image_dedup_max_distance"]
+    groups = {}  # representative dhash -> {"chunk_indexes": set(), "stored_at": None}
+    occurrences = []  # per chunk : [(image_base64, representative dhash or None)]
+
+    for prepared_chunk in prepared_chunks:
+        chunk_occurrences = []
+        for image_base64 in prepared_chunk["content_data"]["images"]:
+            dhash = compute_image_dhash(image_base64)
+            if dhash is not None:
+                similar_hash = find_similar_image_hash(dhash, groups, max_distance)
+                dhash = similar_hash if similar_hash is not None else dhash
+                groups.setdefault(dhash, {"chunk_indexes": set(), "stored_at": None})["chunk_indexes"].add(prepared_chunk["chunk_index"])
+            chunk_occurrences.append((image_base64, dhash))
+        occurrences.append(chunk_occurrences)
+
+    boilerplate_hashes = {dhash for dhash, group in groups.items() if len(group["chunk_indexes"]) >= appConfig["image_boilerplate_min_chunks"]}
+    if appConfig["image_dedup_project_scope"] and project_id and groups:
+        boilerplate_hashes |= find_project_boilerplate_images(project_id, document_id, list(groups))
+
+    dedup_stats = {"unique_images": 0, "duplicate_images": 0, "boilerplate_images": 0}
+    for prepared_chunk, chunk_occurrences in zip(prepared_chunks, occurrences):
+        content_data = prepared_chunk["content_data"]
+        images, image_refs, boilerplate_images = [], [], []
+        for image_base64, dhash in chunk_occurrences:
+            group = groups.get(dhash)
+            if group is None:
+                images.append(image_base64)
+            elif dhash in boilerplate_hashes:
+                dedup_stats["boilerplate_images"] += 1
+                if group["stored_at"] is None:
+                    group["stored_at"] = {"chunk_index": prepared_chunk["chunk_index"]}
+                    boilerplate_images.append(image_base64)
+            elif group["stored_at"] is None:
+                group["stored_at"] = {"chunk_index": prepared_chunk["chunk_index"], "image_index": len(images)}
+                images.append(image_base64)
+                dedup_stats["unique_images"] += 1
+            else:
+                dedup_stats["duplicate_images"] += 1
+                if group["stored_at"]["chunk_index"] != prepared_chunk["chunk_index"] and group["stored_at"] not in image_refs:
+                    image_refs.append(group["stored_at"])
+
+        content_data["images"] = images
+        if image_refs:
+            content_data["image_refs"] = image_refs
+        if boilerplate_images:
+            content_data["boilerplate_images"] = boilerplate_images
+        if not images and not image_refs:
+            content_data["types"] = [content_type for content_type in content_data["types"] if content_type != "image"]
+
+    return dedup_stats
+
+
+# KEYS : project counts (hash), counted hashes of the document (set)
+# ARGV : matched hashes of the document
+# Counts a document's images once (also when it is re-ingested or resumed) : returns 1 if counted now, 0 if already counted.
+COUNT_DOCUMENT_IMAGES_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+for _, dhash in ipairs(ARGV) do
+    redis.call('HINCRBY', KEYS[1], dhash, 1)
+end
+redis.call('SADD', KEYS[2], unpack(ARGV))
+return 1
+"""
+
+# KEYS : project counts (hash), counted hashes of the document (set)
+# Undoes COUNT_DOCUMENT_IMAGES_SCRIPT for a deleted document. Returns the number of hashes decremented.
+FORGET_DOCUMENT_IMAGES_SCRIPT = """
+if redis.call('TYPE', KEYS[2])['ok'] ~= 'set' then
+    -- Marker of a document counted before the counted hashes were kept : nothing to decrement.
+    redis.call('DEL', KEYS[2])
+    return 0
+end
+local counted = redis.call('SMEMBERS', KEYS[2])
+for _, dhash in ipairs(counted) do
+    if redis.call('HINCRBY', KEYS[1], dhash, -1) <= 0 then
+        redis.call('HDEL', KEYS[1], dhash)
+    end
+end
+redis.call('DEL', KEYS[2])
+return #counted
+"""
+
+_count_document_images = redis_client.register_script(COUNT_DOCUMENT_IMAGES_SCRIPT)
+_forget_document_images = redis_client.register_script(FORGET_DOCUMENT_IMAGES_SCRIPT)
+
+
+def project_image_dedup_keys(project_id: str, document_id: str):
+    project_key = f"image_dedup:{project_id}"
+    return project_key, f"{project_key}:counted:{document_id}"
+
+
+def find_project_boilerplate_images(project_id: str, document_id: str, dhashes):
+    """
+    Project-wide image counts (Redis hash `image_dedup:{project_id}` : dhash -> documents containing it).
+    Counts the images of this document once (the hashes it counted are kept in `image_dedup:{project_id}:counted:{document_id}`,
+    see forget_document_images) and returns those already seen in enough documents of the project.
+    Redis errors only disable the project-wide part.
+    """
+    if not dhashes:
+        return set()
+
+    project_key, counted_key = project_image_dedup_keys(project_id, document_id)
+    try:
+        known_counts = {int(dhash): int(count) for dhash, count in redis_client.hgetall(project_key).items()}
+        matched_hashes = {}
+        for dhash in dhashes:
+            known_hash = find_similar_image_hash(dhash, known_counts, appConfig["image_dedup_max_distance"])
+            matched_hashes[dhash] = known_hash if known_hash is not None else dhash
+
+        newly_counted = bool(_count_document_images(keys=[project_key, counted_key], args=sorted(set(matched_hashes.values()))))
+
+        boilerplate_hashes = set()
+        for dhash, matched_hash in matched_hashes.items():
+            documents_with_image = known_counts.get(matched_hash, 0) + (1 if newly_counted else 0)
+            if documents_with_image >= appConfig["image_boilerplate_min_documents"]:
+                boilerplate_hashes.add(dhash)
+        return boilerplate_hashes
+    except Exception as e:
+        logger.warning("project_image_dedup_failed", project_id=project_id, error=str(e))
+        return set()
+
+
+def forget_document_images(project_id: str, document_id: str) -> None:
+    """Remove a deleted document from the project-wide image counts. Best effort : logged, never raised."""
+    try:
+        forgotten_hashes = _forget_document_images(keys=list(project_image_dedup_keys(project_id, document_id)))
+        logger.info("document_images_forgotten", project_id=project_id, document_id=document_id, image_hashes=forgotten_hashes)
+    except Exception as e:
+        logger.warning("document_images_forget_failed", project_id=project_id, document_id=document_id, error=str(e))
+
+
+def forget_project_images(project_id: str) -> None:
+    """Drop the image counts of a deleted project. Best effort : logged, never raised."""
+    project_key = f"image_dedup:{project_id}"
+    try:
+        counted_keys = list(redis_client.scan_iter(match=f"{project_key}:counted:*", count=500))
+        redis_client.delete(project_key, *counted_keys)
+    except Exception as e:
+        logger.warning("project_images_forget_failed", project_id=project_id, error=str(e))
+
+
+def compute_chunk_fingerprint(content_data):
+    """Fingerprint of a chunk's content (text, tables, images) - identical content always gives the same hash."""
+    fingerprint_content = [content_data["text"], content_data["tables"], content_data["images"]]
+    # Deduplicated images (references to other chunks by position, boilerplate stored here) are content too when present.
+    if content_data.get("image_refs") or content_data.get("boilerplate_images"):
+        fingerprint_content += [content_data.get("image_refs", []), content_data.get("boilerplate_images", [])]
+    return hashlib.sha256(json.dumps(fingerprint_content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
 def get_page_number(chunk, chunk_index):
     """Get page number from chunk or use fallback"""
     if hasattr(chunk, "metadata"):
@@ -145,25 +607,16 @@ def get_page_number(chunk, chunk_index):
     return chunk_index + 1
 
 
-def create_ai_summary(text, tables_html, images_base64):
-    """Create AI-enhanced summary for tables and images present in the chunks"""
-
-    try:
-        # Build the text prompt with more efficient instructions
-        prompt_text = f"""
+# Prompt template of create_ai_summary. Any edit here changes SUMMARY_PROMPT_VERSION and therefore invalidates the summary cache.
+SUMMARY_PROMPT_CONTENT = """
             Create a searchable index for this document content.
             CONTENT:
             {text}
         """
 
-        # Add tables if present
-        if tables_html:
-            prompt_text += "TABLES:\n"
-            for i, table in enumerate(tables_html):
-                prompt_text += f"Table {i+1}:\n{table}\n\n"
+SUMMARY_PROMPT_TABLE = "Table {number}:\n{table}\n\n"
 
-        # More concise but effective prompt
-        prompt_text += """
+SUMMARY_PROMPT_INSTRUCTIONS = """
             Generate a structured search index (aim for 250-400 words):
 
             QUESTIONS: List 5-7 key questions this content answers (use what/how/why/when/who variations)
@@ -188,15 +641,89 @@ def create_ai_summary(text, tables_html, images_base64):
 
             SEARCH INDEX:"""
 
+SUMMARY_PROMPT_VERSION = hashlib.sha256(
+    "\x00".join(
+        [
+            SUMMARY_PROMPT_CONTENT,
+            SUMMARY_PROMPT_TABLE,
+            SUMMARY_PROMPT_INSTRUCTIONS,
+            openAI["embeddings_llm"].model_name,
+            str(appConfig["image_low_detail_max_dimension"]),  # Vision detail selection, see choose_image_detail
+        ]
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+SUMMARY_CACHE_PREFIX = "summary_cache"
+SUMMARY_CACHE_STATS_KEY = f"{SUMMARY_CACHE_PREFIX}:stats"
+
+# KEYS : summary, stats (hash)
+# Returns the cached summary (nil on a miss) and counts the hit / miss, in one round trip.
+GET_CACHED_SUMMARY_SCRIPT = """
+local summary = redis.call('GET', KEYS[1])
+redis.call('HINCRBY', KEYS[2], summary and 'hits' or 'misses', 1)
+return summary
+"""
+
+_get_cached_summary = redis_client.register_script(GET_CACHED_SUMMARY_SCRIPT)
+
+
+def summary_cache_key(text, tables_html, images_base64):
+    """Content-addressed key : hash of the text, tables and images, namespaced by the prompt version."""
+    content_hash = hashlib.sha256(
+        json.dumps([text, tables_html, images_base64], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return f"{SUMMARY_CACHE_PREFIX}:{SUMMARY_PROMPT_VERSION}:{content_hash}"
+
+
+def get_cached_summary(cache_key):
+    """Cached summary or None. The cache is an optimization only, Redis errors count as a miss."""
+    try:
+        cached_summary = _get_cached_summary(keys=[cache_key, SUMMARY_CACHE_STATS_KEY])
+        return cached_summary.decode("utf-8") if cached_summary is not None else None
+    except Exception as e:
+        logger.warning("summary_cache_read_failed", error=str(e))
+        return None
+
+
+def set_cached_summary(cache_key, summary):
+    try:
+        # Entries of an old prompt version are never read again and simply expire.
+        redis_client.set(cache_key, summary, ex=appConfig["summary_cache_ttl_seconds"])
+    except Exception as e:
+        logger.warning("summary_cache_write_failed", error=str(e))
+
+
+def create_ai_summary(text, tables_html, images_base64):
+    """Create AI-enhanced summary for tables and images present in the chunks"""
+
+    try:
+        # Same content + same prompt version = same summary, skip the (slow, multimodal) LLM call.
+        cache_key = summary_cache_key(text, tables_html, images_base64)
+        cached_summary = get_cached_summary(cache_key)
+        if cached_summary is not None:
+            return cached_summary
+
+        # Build the text prompt with more efficient instructions
+        prompt_text = SUMMARY_PROMPT_CONTENT.format(text=text)
+
+        # Add tables if present
+        if tables_html:
+            prompt_text += "TABLES:\n"
+            for i, table in enumerate(tables_html):
+                prompt_text += SUMMARY_PROMPT_TABLE.format(number=i + 1, table=table)
+
+        # More concise but effective prompt
+        prompt_text += SUMMARY_PROMPT_INSTRUCTIONS
+
         # Build message content starting with the text prompt
         message_content = [{"type": "text", "text": prompt_text}]
 
-        # Add images to the message
+        # Add images to the message (JPEG, see preprocess_image), small ones at low detail.
         for i, image_base64 in enumerate(images_base64):
             message_content.append(
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
+                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}", "detail": choose_image_detail(image_base64)},
                 }
             )
             # print(f"🖼️ Image {i+1} included in summary request")
@@ -204,7 +731,336 @@ def create_ai_summary(text, tables_html, images_base64):
         message = HumanMessage(content=message_content)
         response = openAI["embeddings_llm"].invoke([message])
 
+        set_cached_summary(cache_key, response.content)
         return response.content
 
     except Exception as e:
         raise Exception(f"Failed to create AI summary: {str(e)}")
+
+
+def build_insert_batches(rows, max_rows=100, max_bytes=4 * 1024 * 1024):
+    """
+    Group rows into multi-row insert batches bounded by row count and (approximate) JSON payload size.
+    Generator : rows can be a stream, a batch is yielded as soon as it is full.
+    """
+
+    current_batch = []
+    current_bytes = 0
+
+    for row in rows:
+        row_bytes = len(json.dumps(row, default=str))
+
+        # Start a new batch when this row would overflow the current one. A single oversized row still gets its own batch.
+        if current_batch and (len(current_batch) >= max_rows or current_bytes + row_bytes > max_bytes):
+            yield current_batch
+            current_batch = []
+            current_bytes = 0
+
+        current_batch.append(row)
+        current_bytes += row_bytes
+
+    if current_batch:
+        yield current_batch
+
+
+_STAGE_FINISHED = object()
+STAGE_IDLE = object()  # Yielded by run_stage_in_background(idle_seconds=...) when no item arrived in time.
+
+
+def run_stage_in_background(stage, buffer_size, idle_seconds=None):
+    """
+    Run a pipeline stage (any iterator/generator) in a background thread and hand its items over through a bounded queue.
+
+    The stage runs ahead of its consumer by at most buffer_size items (backpressure). Errors of the stage are re-raised
+    in the consumer; closing the returned generator stops the stage (and closes it, which propagates upstream).
+    idle_seconds : when set, STAGE_IDLE is yielded every time no item arrived for that long (lets the consumer act on timers).
+    """
+    buffer = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+
+    def hand_over(entry):
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in stage:
+                if not hand_over((item, None)):
+                    return
+            hand_over((_STAGE_FINISHED, None))
+        except BaseException as e:
+            hand_over((_STAGE_FINISHED, e))
+        finally:
+            if hasattr(stage, "close"):
+                stage.close()
+
+    # copy_context() so the stage keeps our logging context (request_id, project_id).
+    threading.Thread(target=contextvars.copy_context().run, args=(produce,), daemon=True).start()
+
+    def consume():
+        try:
+            while True:
+                try:
+                    item, error = buffer.get(timeout=idle_seconds)
+                except queue.Empty:
+                    yield STAGE_IDLE
+                    continue
+                if item is _STAGE_FINISHED:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    return consume()
+
+
+# OpenAI embeddings API limits per request.
+EMBEDDING_REQUEST_MAX_INPUTS = 2048
+EMBEDDING_REQUEST_MAX_TOKENS = 300000
+EMBEDDING_MAX_ATTEMPTS = 6
+EMBEDDING_PACK_BUFFER = 64  # Items read ahead by EmbeddingBatcher.pack.
+
+
+def get_retry_after_seconds(error, default: float) -> float:
+    """Wait time the API asked for (retry-after-ms / retry-after headers of a 429), or default."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+class EmbeddingBatcher:
+    """
+    Token-aware, rate-limit-aware embedding requests for ingestion.
+
+    * pack() groups texts into requests by token count (tiktoken) up to `embedding_batch_max_tokens` / 2048 inputs,
+      flushing early after `embedding_batch_linger_seconds` so a slow upstream stage does not hold a batch back.
+    * submit() runs requests concurrently. The number of requests in flight (`concurrency_limit`) adapts (AIMD) :
+      halved on every 429, raised by one after a full round of successes, up to `embedding_max_concurrency`.
+    * A 429 pauses every request of the batcher for the retry-after time the API sent.
+    """
+
+    def __init__(self, embeddings=None):
+        self.embeddings = embeddings or openAI["ingestion_embeddings"]
+        self.max_concurrency = max(1, appConfig["embedding_max_concurrency"])
+        self.max_tokens = min(appConfig["embedding_batch_max_tokens"], EMBEDDING_REQUEST_MAX_TOKENS)
+        self.linger_seconds = appConfig["embedding_batch_linger_seconds"]
+        self.concurrency_limit = self.max_concurrency
+        try:
+            self.encoding = tiktoken.encoding_for_model(self.embeddings.model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self._lock = threading.Lock()
+        self._successes = 0
+        self._resume_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def pack(self, items, get_text):
+        """
+        Yield lists of items whose texts fit in one embeddings request.
+        items are read in a background thread, so a partial batch is flushed once it is `linger_seconds` old even while
+        the upstream stage has nothing new to hand over.
+        """
+        batch = []
+        batch_tokens = 0
+        batch_started_at = 0.0
+
+        buffered_items = run_stage_in_background(items, EMBEDDING_PACK_BUFFER, idle_seconds=max(self.linger_seconds / 4, 0.05))
+        try:
+            for item in buffered_items:
+                if item is STAGE_IDLE:
+                    if batch and time.monotonic() - batch_started_at >= self.linger_seconds:
+                        yield batch
+                        batch = []
+                        batch_tokens = 0
+                    continue
+
+                item_tokens = self.count_tokens(get_text(item))
+                if batch and (
+                    batch_tokens + item_tokens > self.max_tokens
+                    or len(batch) >= EMBEDDING_REQUEST_MAX_INPUTS
+                    or time.monotonic() - batch_started_at >= self.linger_seconds
+                ):
+                    yield batch
+                    batch = []
+                    batch_tokens = 0
+
+                if not batch:
+                    batch_started_at = time.monotonic()
+                batch.append(item)
+                batch_tokens += item_tokens
+        finally:
+            buffered_items.close()
+
+        if batch:
+            yield batch
+
+    def submit(self, texts):
+        """Embed texts in the background. Returns a Future of the embeddings (same order as texts)."""
+        # copy_context() so the worker threads keep our logging context (request_id, project_id).
+        return self._executor.submit(contextvars.copy_context().run, self._embed_with_retries, texts)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _embed_with_retries(self, texts):
+        if not texts:
+            return []
+
+        attempt = 0
+        while True:
+            # Respect the pause requested by the latest 429 (possibly hit by another request of this batcher).
+            with self._lock:
+                wait_time = self._resume_at - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+            try:
+                embeddings = self.embeddings.embed_documents(texts, chunk_size=len(texts))
+                self._on_success()
+                return embeddings
+            except Exception as e:
+                attempt += 1
+                if attempt >= EMBEDDING_MAX_ATTEMPTS:
+                    logger.error("embedding_request_failed", inputs=len(texts), attempt=attempt, error=str(e))
+                    raise e
+
+                if isinstance(e, openai.RateLimitError):
+                    wait_time = get_retry_after_seconds(e, default=2**attempt)
+                    self._on_rate_limited(wait_time)
+                    logger.warning("embedding_rate_limited", inputs=len(texts), attempt=attempt, wait_seconds=wait_time, concurrency_limit=self.concurrency_limit)
+                else:
+                    wait_time = 2**attempt
+                    logger.warning("embedding_retry", inputs=len(texts), attempt=attempt, wait_seconds=wait_time, error=str(e))
+                    time.sleep(wait_time)
+
+    def _on_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.concurrency_limit and self.concurrency_limit < self.max_concurrency:
+                self.concurrency_limit += 1
+                self._successes = 0
+
+    def _on_rate_limited(self, wait_time: float):
+        with self._lock:
+            self.concurrency_limit = max(1, self.concurrency_limit // 2)
+            self._successes = 0
+            self._resume_at = max(self._resume_at, time.monotonic() + wait_time)
+
+
+# Ingestion checkpoints (S3) : the output of every ingestion stage is kept under `ingestion/{document_id}/` until the
+# document is completed, so a retry (or an explicit resume) continues from the last completed work instead of starting over.
+#
+#   - elements.json.gz      : partitioned elements (+ elements summary / partition details)
+#   - chunks.json.gz        : prepared chunks (also the hand-off between the cpu and io Celery workers)
+#   - summaries/<part>.json.gz  : processed chunks, written part by part while summarising
+#   - embeddings/<part>.json.gz : embeddings of the processed chunks, written part by part while vectorizing
+
+CHECKPOINT_PART_SIZE = 100  # Items per checkpoint part of the streaming stages.
+
+
+def stage_output_prefix(document_id: str) -> str:
+    return f"ingestion/{document_id}/"
+
+
+def stage_output_key(document_id: str, stage: str) -> str:
+    return f"{stage_output_prefix(document_id)}{stage}.json.gz"
+
+
+def save_stage_output(document_id: str, stage: str, payload) -> str:
+    """Store the (JSON-serialisable) output of an ingestion stage in S3 as gzipped JSON."""
+    key = stage_output_key(document_id, stage)
+    body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    s3_client.put_object(Bucket=appConfig["s3_bucket_name"], Key=key, Body=body, ContentType="application/gzip")
+    logger.info("stage_output_saved", document_id=document_id, stage=stage, size_bytes=len(body))
+    return key
+
+
+def load_stage_output(document_id: str, stage: str):
+    """Output saved by save_stage_output, or None if the stage has no checkpoint."""
+    try:
+        response = s3_client.get_object(Bucket=appConfig["s3_bucket_name"], Key=stage_output_key(document_id, stage))
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(gzip.decompress(response["Body"].read()))
+
+
+def list_stage_output_keys(document_id: str, stage_prefix: str = ""):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(Bucket=appConfig["s3_bucket_name"], Prefix=f"{stage_output_prefix(document_id)}{stage_prefix}")
+    return [item["Key"] for page in pages for item in page.get("Contents", [])]
+
+
+def delete_stage_outputs(document_id: str):
+    """Drop every checkpoint of a document (completed ingestion, or a fresh run that must not reuse stale output)."""
+    keys = list_stage_output_keys(document_id)
+    # delete_objects accepts at most 1000 keys per request.
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=appConfig["s3_bucket_name"],
+            Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True},
+        )
+    if keys:
+        logger.info("stage_outputs_deleted", document_id=document_id, objects=len(keys))
+
+
+class StageCheckpoint:
+    """
+    Checkpoint of a streaming stage, written part by part while the stage runs (`{stage}/<uuid>.json.gz`), so a failure
+    late in the pipeline keeps everything finished before it. Items must be JSON-serialisable.
+    Writes are best effort : a failed checkpoint write is logged and never fails the ingestion.
+
+    Usage:
+        checkpoint = StageCheckpoint(document_id, "summaries")
+        done = checkpoint.load()      # items saved by previous attempts
+        checkpoint.add(item)          # ... for every new item
+        checkpoint.flush()            # in a finally block
+    """
+
+    def __init__(self, document_id: str, stage: str, part_size: int = CHECKPOINT_PART_SIZE):
+        self.document_id = document_id
+        self.stage = stage
+        self.part_size = part_size
+        self._buffer = []
+
+    def load(self):
+        items = []
+        try:
+            for key in list_stage_output_keys(self.document_id, f"{self.stage}/"):
+                response = s3_client.get_object(Bucket=appConfig["s3_bucket_name"], Key=key)
+                items.extend(json.loads(gzip.decompress(response["Body"].read())))
+        except Exception as e:
+            logger.warning("stage_checkpoint_load_failed", document_id=self.document_id, stage=self.stage, error=str(e))
+            return []
+        if items:
+            logger.info("stage_checkpoint_loaded", document_id=self.document_id, stage=self.stage, items=len(items))
+        return items
+
+    def add(self, item):
+        self._buffer.append(item)
+        if len(self._buffer) >= self.part_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        try:
+            save_stage_output(self.document_id, f"{self.stage}/{uuid.uuid4().hex}", self._buffer)
+        except Exception as e:
+            logger.warning("stage_checkpoint_write_failed", document_id=self.document_id, stage=self.stage, items=len(self._buffer), error=str(e))
+        self._buffer = []
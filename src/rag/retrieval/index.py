@@ -1,17 +1,52 @@
+import contextvars
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from src.services.llm import openAI
+from src.config.index import appConfig
 from fastapi import HTTPException
-from src.services.supabase import supabase
+from src.services.supabase import search_supabase
+from src.services.queryEmbeddingCache import get_cached_query_embeddings, set_cached_query_embeddings
 from src.rag.retrieval.utils import (
     get_project_settings,
     get_project_document_ids,
     build_context_from_retrieved_chunks,
     generate_query_variations,
+    hydrate_chunks,
+    rrf_rank_and_fuse,
 )
 from typing import List, Dict
 from src.config.logging import get_logger, set_project_id
 
 logger = get_logger(__name__)
 
+# Runs the legs of a search (query embedding, database searches) in threads so they can be waited on with a deadline
+# (and, in multi-query searches, overlap the query variation generation). Threads : the OpenAI and Supabase clients
+# used here are blocking. A leg given up after its deadline keeps its thread until the client call ends : the search
+# clients have request timeouts (see search_supabase and openAI["embeddings"]) so those threads are freed soon after.
+search_executor = ThreadPoolExecutor(max_workers=appConfig["retrieval_search_workers"], thread_name_prefix="search_leg")
+
+
+def run_search_leg(function, *args):
+    # copy_context() so the leg keeps our logging context (request_id, project_id).
+    return search_executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def wait_for_search_leg(leg_future, leg_name, deadline):
+    """
+    Result of a search leg, None when it failed or did not finish by `deadline` (time.monotonic()). Deadlines are
+    taken when the search starts, so the time a leg spends queued for a thread counts too.
+    """
+    try:
+        return leg_future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        # Only drops a leg still queued for a thread; a running one finishes in the background, its result unused.
+        leg_future.cancel()
+        logger.warning("search_leg_timeout", leg=leg_name)
+    except Exception as e:
+        logger.warning("search_leg_failed", leg=leg_name, error=str(e))
+    return None
+
 
 def retrieve_context(project_id, user_query):
     set_project_id(project_id)
@@ -24,7 +59,8 @@ def retrieve_context(project_id, user_query):
         * Step 4: Perform a hybrid search (combines vector + keyword search) using RPC function.
         * Step 5: Perform multi-query vector search (generate multiple query variations and search)
         * Step 6: Perform multi-query hybrid search (multiple queries with hybrid strategy)
-        * Step 7: Build the context from the retrieved chunks and format them into a structured context with citations.
+        * Step 7: Keep the top k chunks and hydrate them - the searches above only return ids and scores.
+        * Step 8: Build the context from the retrieved chunks and format them into a structured context with citations.
         """
         # Step 1: Get user's project settings from the database.
         project_settings = get_project_settings(project_id)
@@ -42,7 +78,7 @@ def retrieve_context(project_id, user_query):
             logger.info("vector_search_completed", chunks_found=len(chunks))
         elif strategy == "hybrid":
             # Hybrid RAG Strategy: Combines vector + keyword search with RRF ranking
-            chunks = hybrid_search(user_query, document_ids, project_settings)
+            chunks = hybrid_search(user_query, document_ids, project_settings, project_settings["final_context_size"])
             logger.info("hybrid_search_completed", chunks_found=len(chunks))
         elif strategy == "multi-query-vector":
             chunks = multi_query_vector_search(user_query, document_ids, project_settings)
@@ -51,8 +87,8 @@ def retrieve_context(project_id, user_query):
             chunks = multi_query_hybrid_search(user_query, document_ids, project_settings)
             logger.info("multi_query_hybrid_search_completed", chunks_found=len(chunks))
 
-        # Step 8: Selecting top k chunks
-        chunks = chunks[: project_settings["final_context_size"]]
+        # Step 7: Selecting top k chunks, then fetching their content in ONE query
+        chunks = hydrate_chunks(chunks[: project_settings["final_context_size"]])
         logger.info("chunks_limited", final_chunk_count=len(chunks))
 
         texts, images, tables, citations = build_context_from_retrieved_chunks(chunks)
@@ -64,10 +100,41 @@ def retrieve_context(project_id, user_query):
         raise HTTPException(status_code=500, detail=f"Failed in RAG's Retrieval: {str(e)}")
 
 
-def vector_search(user_query, document_ids, project_settings):
-    user_query_embedding = openAI["embeddings"].embed_documents([user_query])[0]
-    vector_search_result_chunks = supabase.rpc(
-        "vector_search_document_chunks",
+def embed_query(query):
+    query_embedding = embed_queries([query])[0]
+    if query_embedding is None:
+        raise Exception("Failed to embed query")
+    return query_embedding
+
+
+def embed_queries(queries):
+    """
+    Embeddings of several queries : served from the query embedding cache when possible, the others computed in ONE
+    embeddings call. On failure the missing entries are None (each search embeds its own query).
+    """
+    query_embeddings = get_cached_query_embeddings(queries)
+    missing = [index for index, query_embedding in enumerate(query_embeddings) if query_embedding is None]
+    if not missing:
+        return query_embeddings
+
+    missing_queries = [queries[index] for index in missing]
+    try:
+        computed_embeddings = openAI["embeddings"].embed_documents(missing_queries)
+    except Exception as e:
+        logger.warning("query_embeddings_failed", query_count=len(missing_queries), error=str(e))
+        return query_embeddings
+
+    set_cached_query_embeddings(missing_queries, computed_embeddings)
+    for index, query_embedding in zip(missing, computed_embeddings):
+        query_embeddings[index] = query_embedding
+    return query_embeddings
+
+
+def vector_search(user_query, document_ids, project_settings, query_embedding=None):
+    """Slim vector search : returns [{id, document_id, score}] (see hydrate_chunks)"""
+    user_query_embedding = query_embedding if query_embedding is not None else embed_query(user_query)
+    vector_search_result_chunks = search_supabase.rpc(
+        "vector_search_document_chunk_ids",
         {
             "query_embedding": user_query_embedding,
             "filter_document_ids": document_ids,
@@ -79,8 +146,9 @@ def vector_search(user_query, document_ids, project_settings):
 
 
 def keyword_search(query, document_ids, settings):
-    keyword_search_result_chunks = supabase.rpc(
-        "keyword_search_document_chunks",
+    """Slim keyword search : returns [{id, document_id, score}] (see hydrate_chunks)"""
+    keyword_search_result_chunks = search_supabase.rpc(
+        "keyword_search_document_chunk_ids",
         {
             "query_text": query,
             "filter_document_ids": document_ids,
@@ -93,25 +161,124 @@ def keyword_search(query, document_ids, settings):
     )
 
 
-def hybrid_search(query: str, document_ids: List[str], settings: dict) -> List[Dict]:
-    """Execute hybrid search by combining vector and keyword results"""
-    # Get results from both search methods
-    vector_results = vector_search(query, document_ids, settings)
-    keyword_results = keyword_search(query, document_ids, settings)
-    logger.info("hybrid_search_results", vector_count=len(vector_results), keyword_count=len(keyword_results))
-    return rrf_rank_and_fuse([vector_results, keyword_results], [settings["vector_weight"], settings["keyword_weight"]])
+def hybrid_search(query: str, document_ids: List[str], settings: dict, result_limit=None, query_embedding=None) -> List[Dict]:
+    """
+    Execute hybrid search by combining vector and keyword results.
+    Both searches and their weighted RRF fusion run in ONE database call (hybrid_search_document_chunks).
+    result_limit=None returns every fused candidate (needed when the results are fused again across queries).
+
+    The fused search needs the query embedding, so the two steps run one after the other : the legs only go through
+    search_executor to be bounded by deadlines, both from the start of the search :
+      - `retrieval_leg_timeout_seconds` for embedding the query + the fused search.
+      - `retrieval_search_timeout_seconds` for the whole search : when the embedding or the fused search fails / times
+        out, a keyword-only search (no embedding needed) gets the time left and its results are returned instead.
+    """
+    started_at = time.monotonic()
+    fused_deadline = started_at + appConfig["retrieval_leg_timeout_seconds"]
+    search_deadline = started_at + max(appConfig["retrieval_search_timeout_seconds"], appConfig["retrieval_leg_timeout_seconds"])
+
+    if query_embedding is None:
+        query_embedding = wait_for_search_leg(run_search_leg(embed_query, query), "embedding", fused_deadline)
+
+    if query_embedding is not None:
+        chunks = wait_for_search_leg(
+            run_search_leg(fused_hybrid_search, query, query_embedding, document_ids, settings, result_limit),
+            "hybrid",
+            fused_deadline,
+        )
+        if chunks is not None:
+            return chunks
+
+    keyword_results = wait_for_search_leg(
+        run_search_leg(keyword_search, query, document_ids, settings), "keyword", search_deadline
+    )
+    if keyword_results is None:
+        raise Exception("Failed hybrid search: both the vector and the keyword search failed")
+    logger.warning("hybrid_search_degraded", fallback="keyword", keyword_count=len(keyword_results))
+    return keyword_results[:result_limit] if result_limit else keyword_results
+
+
+def fused_hybrid_search(query, query_embedding, document_ids, settings, result_limit=None):
+    hybrid_search_result_chunks = search_supabase.rpc(
+        "hybrid_search_document_chunks",
+        {
+            "query_embedding": query_embedding,
+            "query_text": query,
+            "filter_document_ids": document_ids,
+            "match_threshold": settings["similarity_threshold"],
+            "chunks_per_search": settings["chunks_per_search"],
+            "vector_weight": settings["vector_weight"],
+            "keyword_weight": settings["keyword_weight"],
+            "result_limit": result_limit,
+        },
+    ).execute()
+    chunks = hybrid_search_result_chunks.data if hybrid_search_result_chunks.data else []
+    logger.info("hybrid_search_results", fused_count=len(chunks))
+    return chunks
+
+
+def generate_and_embed_query_variations(user_query, project_settings):
+    """
+    Query variations and their embeddings. The original query is embedded while the variations are being generated,
+    the variations themselves in ONE batched embeddings call. Returns (queries, query_embeddings) - an embedding that
+    could not be computed is None.
+    """
+    original_embedding_future = run_search_leg(embed_query, user_query)
+    queries = generate_query_variations(user_query, project_settings["number_of_queries"])
+    embedding_deadline = time.monotonic() + appConfig["retrieval_leg_timeout_seconds"]
+    query_embeddings = [wait_for_search_leg(original_embedding_future, "embedding", embedding_deadline)] + embed_queries(queries[1:])
+    return queries, query_embeddings
+
+
+def search_query_variations(search_function, queries, query_embeddings, document_ids, project_settings):
+    """
+    Run search_function for every query variation (with its precomputed embedding) concurrently (at most `retrieval_max_parallel_queries` at a time).
+    Each query gets `retrieval_query_timeout_seconds`; failed or late queries are left out, so the fusion runs over
+    whatever results arrived. Returns the result lists in query order.
+    """
+    max_parallel_queries = max(1, min(appConfig["retrieval_max_parallel_queries"], len(queries)))
+    # Queries beyond the cap wait for a free thread : give every round its own timeout.
+    timeout_seconds = appConfig["retrieval_query_timeout_seconds"] * math.ceil(len(queries) / max_parallel_queries)
+
+    # A pool of its own : the searches submit their legs to search_executor, sharing it could deadlock.
+    executor = ThreadPoolExecutor(max_workers=max_parallel_queries, thread_name_prefix="query_variation")
+    try:
+        query_futures = [
+            executor.submit(
+                contextvars.copy_context().run, search_function, query, document_ids, project_settings, query_embedding=query_embedding
+            )
+            for query, query_embedding in zip(queries, query_embeddings)
+        ]
+        wait(query_futures, timeout=timeout_seconds)
+
+        all_chunks = []
+        for index, (query, query_future) in enumerate(zip(queries, query_futures)):
+            query_num = f"{index+1}/{len(queries)}"
+            if not query_future.done():
+                logger.warning("query_variation_search_timeout", query_num=query_num, query=query, timeout_seconds=timeout_seconds)
+                continue
+            try:
+                chunks = query_future.result()
+            except Exception as e:
+                logger.warning("query_variation_search_failed", query_num=query_num, query=query, error=str(e))
+                continue
+            all_chunks.append(chunks)
+            logger.info("query_variation_search", query_num=query_num, query=query, chunks_found=len(chunks))
+    finally:
+        # Do not wait for the late searches, their results are dropped anyway.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if queries and not all_chunks:
+        raise Exception("Failed multi-query search: no query variation returned results in time")
+    return all_chunks
 
 
 def multi_query_vector_search(user_query, document_ids, project_settings):
     """Execute multi-query vector search using query variations"""
-    queries = generate_query_variations(user_query, project_settings["number_of_queries"])
+    queries, query_embeddings = generate_and_embed_query_variations(user_query, project_settings)
     logger.info("query_variations_generated", query_count=len(queries))
 
-    all_chunks = []
-    for index, query in enumerate(queries):
-        chunks = vector_search(query, document_ids, project_settings)
-        all_chunks.append(chunks)
-        logger.info("query_variation_search", query_num=f"{index+1}/{len(queries)}", query=query, chunks_found=len(chunks))
+    all_chunks = search_query_variations(vector_search, queries, query_embeddings, document_ids, project_settings)
 
     final_chunks = rrf_rank_and_fuse(all_chunks)
     logger.info("rrf_fusion_completed", final_chunks_count=len(final_chunks))
@@ -120,14 +287,10 @@ def multi_query_vector_search(user_query, document_ids, project_settings):
 
 def multi_query_hybrid_search(user_query, document_ids, project_settings):
     """Execute multi-query hybrid search using query variations"""
-    queries = generate_query_variations(user_query, project_settings["number_of_queries"])
+    queries, query_embeddings = generate_and_embed_query_variations(user_query, project_settings)
     logger.info("query_variations_generated_hybrid", query_count=len(queries))
 
-    all_chunks = []
-    for index, query in enumerate(queries):
-        chunks = hybrid_search(query, document_ids, project_settings)
-        all_chunks.append(chunks)
-        logger.info("hybrid_query_variation_search", query_num=f"{index+1}/{len(queries)}", query=query, chunks_found=len(chunks))
+    all_chunks = search_query_variations(hybrid_search, queries, query_embeddings, document_ids, project_settings)
 
     final_chunks = rrf_rank_and_fuse(all_chunks)
     logger.info("rrf_fusion_completed_hybrid", final_chunks_count=len(final_chunks))
@@ -4,6 +4,7 @@ from typing import List, Dict, Tuple
 from langchain_core.messages import SystemMessage, HumanMessage
 from src.services.llm import openAI
 from src.models.index import QueryVariations
+from src.services.imageStore import load_images_base64
 
 
 def get_project_settings(project_id):
@@ -26,6 +27,8 @@ def get_project_settings(project_id):
 
 def get_project_document_ids(project_id):
     try:
+        # No status filter : the search functions only match committed chunks, so a document being (re-)ingested is
+        # searchable with its last committed version, if any (see sync_document_chunks).
         document_ids_result = (
             supabase.table("project_documents")
             .select("id")
@@ -42,6 +45,98 @@ def get_project_document_ids(project_id):
         raise Exception(f"Failed to get document IDs: {str(e)}")
 
 
+CHUNK_HYDRATION_COLUMNS = "id, document_id, content, chunk_index, created_at, page_number, char_count, type, original_content"
+
+
+def hydrate_chunks(chunk_hits: List[Dict]) -> List[Dict]:
+    """
+    Fetch the content of the chunks returned by the slim search functions (id, document_id, score) in ONE query.
+    The order of chunk_hits is kept, each chunk carries the score of its hit. The embedding is never fetched.
+    """
+    if not chunk_hits:
+        return []
+
+    try:
+        chunks_result = (
+            supabase.table("document_chunks")
+            .select(CHUNK_HYDRATION_COLUMNS)
+            .in_("id", [chunk_hit["id"] for chunk_hit in chunk_hits])
+            .execute()
+        )
+    except Exception as e:
+        raise Exception(f"Failed to hydrate chunks: {str(e)}")
+
+    chunks_by_id = {chunk["id"]: chunk for chunk in chunks_result.data or []}
+    # A chunk deleted between search and hydration (document re-ingested meanwhile) is simply dropped.
+    return [
+        {**chunks_by_id[chunk_hit["id"]], "score": chunk_hit.get("score")}
+        for chunk_hit in chunk_hits
+        if chunk_hit["id"] in chunks_by_id
+    ]
+
+
+def get_chunk_image_sources(original_content: Dict) -> List[Dict]:
+    """
+    Images stored by a chunk : {"key": ...} for images in the image store (`original_content.image_keys`),
+    {"base64": ...} for chunks ingested before images were moved out of the chunk rows (`original_content.images`).
+    """
+    original_content = original_content or {}
+    return [{"key": key} for key in original_content.get("image_keys", [])] + [
+        {"base64": image} for image in original_content.get("images", [])
+    ]
+
+
+def resolve_chunk_image_refs(chunks: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Images of every chunk, including the ones it only references (`original_content.image_refs`, see
+    deduplicate_document_images). Referenced chunks that are not among `chunks` are fetched in ONE query.
+    Returns {chunk id: [image source, ...]} (see get_chunk_image_sources) - nothing is downloaded here.
+    """
+    stored_images = {
+        (chunk.get("document_id"), chunk.get("chunk_index")): get_chunk_image_sources(chunk.get("original_content"))
+        for chunk in chunks
+    }
+
+    missing_refs = {
+        (chunk.get("document_id"), image_ref["chunk_index"])
+        for chunk in chunks
+        for image_ref in (chunk.get("original_content") or {}).get("image_refs", [])
+        if (chunk.get("document_id"), image_ref["chunk_index"]) not in stored_images
+    }
+    if missing_refs:
+        referenced_chunks_result = (
+            supabase.table("document_chunks")
+            .select("document_id, chunk_index, original_content")
+            .in_("document_id", list({document_id for document_id, _ in missing_refs}))
+            .in_("chunk_index", list({chunk_index for _, chunk_index in missing_refs}))
+            .eq("committed", True)
+            .execute()
+        )
+        for referenced_chunk in referenced_chunks_result.data or []:
+            stored_images[(referenced_chunk["document_id"], referenced_chunk["chunk_index"])] = get_chunk_image_sources(
+                referenced_chunk.get("original_content")
+            )
+
+    chunk_images_map = {}
+    for chunk in chunks:
+        original_content = chunk.get("original_content") or {}
+        chunk_images = get_chunk_image_sources(original_content)
+        for image_ref in original_content.get("image_refs", []):
+            referenced_images = stored_images.get((chunk.get("document_id"), image_ref["chunk_index"]), [])
+            if image_ref["image_index"] < len(referenced_images):
+                chunk_images.append(referenced_images[image_ref["image_index"]])
+        chunk_images_map[chunk.get("id")] = chunk_images
+    return chunk_images_map
+
+
+def load_image_sources(image_sources: List[Dict]) -> List[str]:
+    """Base64 of the given image sources, in order. Image store objects are fetched concurrently (and cached)."""
+    loaded_images = iter(load_images_base64([source["key"] for source in image_sources if "key" in source]))
+    # One loaded entry per key source (None when it failed), so the results stay aligned with their sources.
+    images = [next(loaded_images) if "key" in source else source["base64"] for source in image_sources]
+    return [image for image in images if image is not None]
+
+
 def build_context_from_retrieved_chunks(
     chunks: List[Dict],
 ) -> Tuple[List[str], List[str], List[str], List[Dict]]:
@@ -75,21 +170,30 @@ def build_context_from_retrieved_chunks(
         )
         filename_map = {doc["id"]: doc["filename"] for doc in result.data}
 
+    # Images deduplicated at ingestion are only referenced by the chunks repeating them.
+    chunk_images_map = resolve_chunk_image_refs(chunks)
+
+    # Images are only downloaded now, for the chunks that made it into the context, each distinct image once.
+    image_sources = []
+    for chunk in chunks:
+        for source in chunk_images_map.get(chunk.get("id"), []):
+            if source not in image_sources:
+                image_sources.append(source)
+    images.extend(load_image_sources(image_sources))
+
     # Process each chunk
     for chunk in chunks:
         original_content = chunk.get("original_content", {})
 
         # Extract content from chunk
         chunk_text = original_content.get("text", "")
-        chunk_images = original_content.get("images", [])
         chunk_tables = original_content.get("tables", [])
 
         if (
             chunk_text
         ):  # Since chunk_text is not going to be an array, Thus we will append it
             texts.append(chunk_text)
-        # Meanwhile, chunk_images and chunk_tables are going to be arrays, Thus we will extend them to the images and tables lists.
-        images.extend(chunk_images)
+        # Meanwhile, chunk_tables is going to be an array, Thus we will extend the tables list with it.
         tables.extend(chunk_tables)
 
         # * Add citation for every chunk
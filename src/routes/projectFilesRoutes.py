@@ -1,16 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from src.services.supabase import supabase
 from src.services.clerkAuth import get_current_user_clerk_id
-from src.models.index import FileUploadRequest, ProcessingStatus, UrlRequest
+from src.models.index import FileUploadRequest, ProcessingStatus, UrlRequest, ReprocessRequest, BatchIngestionRequest, BatchConfirmRequest
 from src.utils.index import validate_url
 from src.config.index import appConfig
 from src.services.awsS3 import s3_client
 import uuid
-from src.services.celery import perform_rag_ingestion_task
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from src.services.celery import schedule_rag_ingestion
+from src.services.ingestionScheduler import estimate_ingestion_cost
+from src.rag.retrieval.utils import resolve_chunk_image_refs
+from src.rag.ingestion.utils import forget_document_images
+from src.services.imageStore import IMAGE_CACHE_CONTROL, IMAGE_KEY_PATTERN, get_image_url, image_key, load_image_bytes
 from src.config.logging import get_logger, set_project_id, set_user_id
 
 logger = get_logger(__name__)
 
+# Documents (files + URLs) per batch request.
+MAX_BATCH_DOCUMENTS = 1000
+# Concurrent S3 head_object calls when confirming the uploads of a batch.
+S3_HEAD_MAX_CONCURRENCY = 16
+
 router = APIRouter(tags=["projectFilesRoutes"])
 
 """
@@ -20,8 +31,13 @@ router = APIRouter(tags=["projectFilesRoutes"])
   - POST `/{project_id}/files/upload-url` ~ Generate presigned url for file upload for frontend
   - POST `/{project_id}/files/confirm` ~ Confirmation of file upload to S3
   - POST `/{project_id}/urls` ~ Add website URL to database
+  - POST `/{project_id}/files/{file_id}/reprocess` ~ Re-ingest a document (incremental by default)
+  - POST `/{project_id}/batches` ~ Add many files and URLs at once (one insert, ingestion scheduled for the whole batch)
+  - POST `/{project_id}/batches/{batch_id}/confirm` ~ Confirmation of the batch file uploads to S3
+  - GET `/{project_id}/batches/{batch_id}` ~ Aggregate progress of a batch
   - DELETE `/{project_id}/files/{file_id}` ~ Delete document from s3 and database
   - GET `/{project_id}/files/{file_id}/chunks` ~ Get project document chunks
+  - GET `/{project_id}/images/{image_hash}` ~ Get an extracted image (stable url, cached by the browser)
 """
 
 
@@ -103,28 +119,10 @@ async def get_upload_presigned_url(
             )
 
         # Generate s3 key
-        file_extension = (
-            file_upload_request.filename.split(".")[-1]
-            if "." in file_upload_request.filename
-            else ""
-        )
-        unique_file_id = uuid.uuid4()
-        s3_key = (
-            f"projects/{project_id}/documents/{unique_file_id}.{file_extension}"
-            if file_extension
-            else f"projects/{project_id}/documents/{unique_file_id}"
-        )
+        s3_key = build_document_s3_key(project_id, file_upload_request.filename)
 
         # Generate upload presigned url (will expire in 1 hour)
-        presigned_url = s3_client.generate_presigned_url(
-            "put_object",
-            Params={
-                "Bucket": appConfig["s3_bucket_name"],
-                "Key": s3_key,
-                "ContentType": file_upload_request.file_type,
-            },
-            ExpiresIn=3600,  # 1 hour
-        )
+        presigned_url = generate_upload_presigned_url(s3_key, file_upload_request.file_type)
 
         if not presigned_url:
             logger.error("presigned_url_generation_failed", s3_key=s3_key)
@@ -188,10 +186,12 @@ async def confirm_file_upload_to_s3(
     ! Logic Flow:
     * 1. Verify S3 key is provided
     * 2. Verify file exists in database
-    * 3. Update file status to "queued"
-    * 4. Perform Celery - RAG Ingestion Task
-    * 5. Update the project document record with the task_id
-    * 6. Return successfully confirmed file upload data
+    * 3. Checksum the uploaded file, if the project already has a completed document with the same checksum
+    *    clone its chunks server-side, mark this document completed and return (no ingestion needed)
+    * 4. Update file status to "queued"
+    * 5. Perform Celery - RAG Ingestion Task
+    * 6. Update the project document record with the task_id
+    * 7. Return successfully confirmed file upload data
     """
     set_project_id(project_id)
     set_user_id(current_user_clerk_id)
@@ -208,7 +208,7 @@ async def confirm_file_upload_to_s3(
         # Verify file exists in database
         document_verification_result = (
             supabase.table("project_documents")
-            .select("id")
+            .select("id, file_size, source_type")
             .eq("s3_key", s3_key)
             .eq("project_id", project_id)
             .eq("clerk_id", current_user_clerk_id)
@@ -222,22 +222,49 @@ async def confirm_file_upload_to_s3(
                 detail="File not found or you don't have permission to confirm upload to S3 for this file",
             )
 
+        # Checksum the upload (S3 ETag) - if this project already ingested the same file, reuse its chunks and embeddings.
+        # Same project only : cloned chunks reference the source project's images, which are deleted with that project.
+        document_id = document_verification_result.data[0]["id"]
+        checksum = get_s3_object_checksum(s3_key)
+        duplicate_document_id = find_completed_document_with_checksum(checksum, project_id, current_user_clerk_id, document_id) if checksum else None
+
+        if duplicate_document_id:
+            supabase.table("project_documents").update({"checksum": checksum}).eq("id", document_id).execute()
+            clone_result = supabase.rpc(
+                "clone_document_chunks",
+                {"source_document_id": duplicate_document_id, "target_document_id": document_id},
+            ).execute()
+            if not clone_result.data:
+                logger.error("document_clone_failed", document_id=document_id, source_document_id=duplicate_document_id, reason="no_data_returned")
+                raise HTTPException(
+                    status_code=422,
+                    detail="Failed to reuse the chunks of the identical document",
+                )
+
+            logger.info("file_upload_deduplicated", document_id=document_id, source_document_id=duplicate_document_id, cloned_chunks=clone_result.data[0]["cloned_chunks"])
+            document_result = supabase.table("project_documents").select("*").eq("id", document_id).execute()
+            return {
+                "message": "File upload to S3 confirmed successfully. An identical document was already processed, its chunks were reused",
+                "data": document_result.data[0],
+            }
+
         # Update file status to "queued"
         document_update_result = (
             supabase.table("project_documents")
             .update(
                 {
                     "processing_status": ProcessingStatus.QUEUED,
+                    "checksum": checksum,
                 }
             )
-            .eq("s3_key", s3_key)
+            .eq("id", document_id)
             .execute()
         )
 
-        # ! Celery - Starts Background Processing - RAG Ingestion Task
-        document_id = document_update_result.data[0]["id"]
-        task_result = perform_rag_ingestion_task.delay(document_id)
-        task_id = task_result.id
+        # ! Celery - Starts Background Processing - RAG Ingestion Task (through the fair ingestion scheduler)
+        task_id = schedule_rag_ingestion(
+            [{"document_id": document_id, "clerk_id": current_user_clerk_id, "cost": estimate_ingestion_cost(document_verification_result.data[0])}]
+        )[0]
         logger.info("rag_ingestion_task_queued", document_id=document_id, task_id=task_id)
 
         document_update_result = (
@@ -291,11 +318,7 @@ async def process_url(
     set_user_id(current_user_clerk_id)
     try:
         # Validate URL
-        url = url.url
-        if url.startswith("http://") or url.startswith("https://"):
-            url = url
-        else:
-            url = f"https://{url}"
+        url = normalize_url(url.url)
 
         logger.info("processing_url", url=url)
         if not validate_url(url):
@@ -333,8 +356,9 @@ async def process_url(
 
         # ! Celery - Starts Background Processing - RAG Ingestion Task
         document_id = document_creation_result.data[0]["id"]
-        task_result = perform_rag_ingestion_task.delay(document_id)
-        task_id = task_result.id
+        task_id = schedule_rag_ingestion(
+            [{"document_id": document_id, "clerk_id": current_user_clerk_id, "cost": estimate_ingestion_cost(document_creation_result.data[0])}]
+        )[0]
         logger.info("url_ingestion_task_queued", document_id=document_id, task_id=task_id, url=url)
 
         document_update_result = (
@@ -372,6 +396,111 @@ async def process_url(
         )
 
 
+@router.post("/{project_id}/files/{file_id}/reprocess")
+async def reprocess_project_document(
+    project_id: str,
+    file_id: str,
+    reprocess_request: ReprocessRequest,
+    current_user_clerk_id: str = Depends(get_current_user_clerk_id),
+):
+    """
+    ! Logic Flow:
+    * 1. Verify document exists and belongs to the current user
+    * 2. Update document status to "queued" - only from "completed" / "failed" (409 while it is queued or ingesting)
+    * 3. Perform Celery - RAG Ingestion Task (incremental: only changed chunks are re-summarised and re-embedded,
+    *    resume: continue a failed ingestion from its last checkpointed stage)
+    * 4. Update the project document record with the task_id
+    * 5. Return the queued document data
+    """
+    set_project_id(project_id)
+    set_user_id(current_user_clerk_id)
+    try:
+        logger.info("reprocessing_document", file_id=file_id, incremental=reprocess_request.incremental, resume=reprocess_request.resume)
+        # Verify document exists and belongs to the current user
+        document_ownership_verification_result = (
+            supabase.table("project_documents")
+            .select("id, file_size, source_type, processing_details")
+            .eq("id", file_id)
+            .eq("project_id", project_id)
+            .eq("clerk_id", current_user_clerk_id)
+            .execute()
+        )
+
+        if not document_ownership_verification_result.data:
+            logger.warning("document_not_found_for_reprocessing", file_id=file_id)
+            raise HTTPException(
+                status_code=404,
+                detail="Document not found or you don't have permission to reprocess this document",
+            )
+
+        # Update document status to "queued" - conditional update, so of two concurrent requests only one goes through.
+        # A second run of a queued / ingesting document would delete the chunk hand-off and uncommitted rows of the first.
+        document_queued_result = (
+            supabase.table("project_documents")
+            .update(
+                {
+                    "processing_status": ProcessingStatus.QUEUED,
+                }
+            )
+            .eq("id", file_id)
+            .in_("processing_status", [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED])
+            .execute()
+        )
+        if not document_queued_result.data:
+            logger.warning("document_reprocessing_conflict", file_id=file_id)
+            raise HTTPException(
+                status_code=409,
+                detail="Document is already queued or being processed, wait for it to finish before reprocessing",
+            )
+
+        # ! Celery - Starts Background Processing - RAG Ingestion Task
+        task_id = schedule_rag_ingestion(
+            [
+                {
+                    "document_id": file_id,
+                    "clerk_id": current_user_clerk_id,
+                    "cost": estimate_ingestion_cost(document_ownership_verification_result.data[0]),
+                    "incremental": reprocess_request.incremental,
+                    "resume": reprocess_request.resume,
+                }
+            ]
+        )[0]
+        logger.info("rag_reingestion_task_queued", document_id=file_id, task_id=task_id)
+
+        document_update_result = (
+            supabase.table("project_documents")
+            .update(
+                {
+                    "task_id": task_id,
+                }
+            )
+            .eq("id", file_id)
+            .execute()
+        )
+        if not document_update_result.data:
+            logger.error("task_id_update_failed", document_id=file_id, task_id=task_id, reason="no_data_returned")
+            raise HTTPException(
+                status_code=422,
+                detail="Failed to update project document record with task_id",
+            )
+
+        logger.info("document_reprocessing_queued", document_id=file_id, task_id=task_id)
+        return {
+            "message": "Started Background Re-Processing of this document",
+            "data": document_update_result.data[0],
+        }
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.error("document_reprocessing_error", file_id=file_id, error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An internal server error occurred while reprocessing project document {file_id} for {project_id}: {str(e)}",
+        )
+
+
 @router.delete("/{project_id}/files/{file_id}")
 async def delete_project_document(
     project_id: str,
@@ -383,7 +512,8 @@ async def delete_project_document(
     * 1. Verify document exists and belongs to the current user and take complete project document record
     * 2. Delete file from S3 (only for actual files, not for URLs)
     * 3. Delete document from database
-    * 4. Return successfully deleted document data
+    * 4. Remove the document from the project-wide image dedup counts
+    * 5. Return successfully deleted document data
     """
     set_project_id(project_id)
     set_user_id(current_user_clerk_id)
@@ -429,6 +559,8 @@ async def delete_project_document(
                 detail="Failed to delete document",
             )
 
+        forget_document_images(project_id, file_id)
+
         logger.info("document_deleted_successfully", file_id=file_id)
         return {
             "message": "Document deleted successfully",
@@ -483,14 +615,27 @@ async def get_project_document_chunks(
             supabase.table("document_chunks")
             .select("*")
             .eq("document_id", file_id)
+            .eq("committed", True)
             .order("chunk_index")
             .execute()
         )
 
-        logger.info("document_chunks_retrieved", file_id=file_id, chunk_count=len(document_chunks_result.data or []))
+        # Images deduplicated at ingestion are only referenced by the chunks repeating them : resolve them for the UI.
+        # Images in the image store are served through the stable image url (browser-cacheable) instead of inline base64.
+        document_chunks = document_chunks_result.data or []
+        chunk_images_map = resolve_chunk_image_refs(document_chunks)
+        for chunk in document_chunks:
+            original_content = chunk.get("original_content") or {}
+            image_sources = chunk_images_map[chunk["id"]]
+            if original_content.get("image_refs"):
+                original_content["images"] = [source["base64"] for source in image_sources if "base64" in source]
+            if any("key" in source for source in image_sources):
+                original_content["image_urls"] = [get_image_url(source["key"]) for source in image_sources if "key" in source]
+
+        logger.info("document_chunks_retrieved", file_id=file_id, chunk_count=len(document_chunks))
         return {
             "message": "Project document chunks retrieved successfully",
-            "data": document_chunks_result.data or [],
+            "data": document_chunks,
         }
 
     except HTTPException as e:
@@ -502,3 +647,397 @@ async def get_project_document_chunks(
             status_code=500,
             detail=f"An internal server error occurred while getting project document chunks for {file_id} for {project_id}: {str(e)}",
         )
+
+
+@router.get("/{project_id}/images/{image_hash}")
+async def get_project_image(
+    project_id: str,
+    image_hash: str,
+    request: Request,
+    current_user_clerk_id: str = Depends(get_current_user_clerk_id),
+):
+    """
+    ! Logic Flow:
+    * 1. Verify project exists and belongs to the current user
+    * 2. Answer 304 when the browser already has the image (images never change for a given hash)
+    * 3. Load the image from the image store (in-process cache) and return it with long-lived cache headers
+    """
+    set_project_id(project_id)
+    set_user_id(current_user_clerk_id)
+    if not IMAGE_KEY_PATTERN.match(image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        # Verify project exists and belongs to the current user
+        project_ownership_verification_result = (
+            supabase.table("projects")
+            .select("id")
+            .eq("id", project_id)
+            .eq("clerk_id", current_user_clerk_id)
+            .execute()
+        )
+
+        if not project_ownership_verification_result.data:
+            raise HTTPException(status_code=404, detail="Image not found")
+
+        headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": f'"{image_hash}"'}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+
+        try:
+            image_bytes = load_image_bytes(image_key(project_id, image_hash))
+        except ClientError:
+            raise HTTPException(status_code=404, detail="Image not found")
+
+        return Response(content=image_bytes, media_type="image/jpeg", headers=headers)
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.error("project_image_retrieval_error", image_hash=image_hash, error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An internal server error occurred while getting image {image_hash} for {project_id}: {str(e)}",
+        )
+
+
+@router.post("/{project_id}/batches")
+async def create_ingestion_batch(
+    project_id: str,
+    batch_request: BatchIngestionRequest,
+    current_user_clerk_id: str = Depends(get_current_user_clerk_id),
+):
+    """
+    ! Logic Flow:
+    * 1. Validate the batch (size, URLs) and verify project exists and belongs to the current user
+    * 2. Generate s3 keys + upload presigned urls for the files, and a task_id for every document up front
+    * 3. Create all project document records in ONE insert (files "pending", URLs "queued"), tagged with the batch_id
+    * 4. Schedule the RAG Ingestion Tasks of the URLs (files follow on batch confirm), dispatched as Celery groups
+    * 5. Return the batch_id, upload presigned urls and documents
+    """
+    set_project_id(project_id)
+    set_user_id(current_user_clerk_id)
+    try:
+        document_count = len(batch_request.files) + len(batch_request.urls)
+        logger.info("creating_ingestion_batch", files=len(batch_request.files), urls=len(batch_request.urls))
+        if document_count == 0 or document_count > MAX_BATCH_DOCUMENTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch must contain between 1 and {MAX_BATCH_DOCUMENTS} files and URLs",
+            )
+
+        urls = [normalize_url(url) for url in batch_request.urls]
+        invalid_urls = [url for url in urls if not validate_url(url)]
+        if invalid_urls:
+            logger.warning("invalid_batch_urls", invalid_urls=invalid_urls)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid URLs: {', '.join(invalid_urls)}",
+            )
+
+        project_ownership_verification_result = (
+            supabase.table("projects")
+            .select("id")
+            .eq("id", project_id)
+            .eq("clerk_id", current_user_clerk_id)
+            .execute()
+        )
+        if not project_ownership_verification_result.data:
+            logger.warning("project_not_found_for_batch")
+            raise HTTPException(
+                status_code=404,
+                detail="Project not found or you don't have permission to add documents to this project",
+            )
+
+        batch_id = str(uuid.uuid4())
+        upload_urls = {}
+        document_records = []
+        for file_upload_request in batch_request.files:
+            s3_key = build_document_s3_key(project_id, file_upload_request.filename)
+            upload_urls[s3_key] = generate_upload_presigned_url(s3_key, file_upload_request.file_type)
+            document_records.append(
+                {
+                    "project_id": project_id,
+                    "filename": file_upload_request.filename,
+                    "s3_key": s3_key,
+                    "file_size": file_upload_request.file_size,
+                    "file_type": file_upload_request.file_type,
+                    "processing_status": ProcessingStatus.PENDING,
+                    "clerk_id": current_user_clerk_id,
+                    "batch_id": batch_id,
+                    "task_id": str(uuid.uuid4()),
+                }
+            )
+        for url in urls:
+            document_records.append(
+                {
+                    "project_id": project_id,
+                    "filename": url,
+                    "s3_key": "",
+                    "file_size": 0,
+                    "file_type": "text/html",
+                    "processing_status": ProcessingStatus.QUEUED,
+                    "clerk_id": current_user_clerk_id,
+                    "source_type": "url",
+                    "source_url": url,
+                    "batch_id": batch_id,
+                    "task_id": str(uuid.uuid4()),
+                }
+            )
+
+        # All records in one statement (PostgREST bulk insert). Every row needs the same keys.
+        for document_record in document_records:
+            document_record.setdefault("source_type", "file")
+            document_record.setdefault("source_url", None)
+        document_creation_result = supabase.table("project_documents").insert(document_records).execute()
+
+        if len(document_creation_result.data or []) != len(document_records):
+            logger.error("batch_document_creation_failed", batch_id=batch_id, reason="no_data_returned")
+            raise HTTPException(
+                status_code=422,
+                detail="Failed to create project documents of the batch - invalid data provided",
+            )
+
+        # ! Celery - Starts Background Processing - RAG Ingestion Tasks (URLs, files are queued on confirm)
+        url_documents = [document for document in document_creation_result.data if document["source_type"] == "url"]
+        if url_documents:
+            schedule_rag_ingestion(
+                [
+                    {"document_id": document["id"], "clerk_id": current_user_clerk_id, "cost": estimate_ingestion_cost(document), "task_id": document["task_id"]}
+                    for document in url_documents
+                ]
+            )
+        logger.info("ingestion_batch_created", batch_id=batch_id, files=len(upload_urls), queued_urls=len(url_documents))
+
+        return {
+            "message": "Batch created successfully. Upload the files and confirm the batch to start processing them",
+            "data": {
+                "batch_id": batch_id,
+                "upload_urls": upload_urls,
+                "documents": document_creation_result.data,
+            },
+        }
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.error("batch_creation_error", error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An internal server error occurred while creating an ingestion batch for {project_id}: {str(e)}",
+        )
+
+
+@router.post("/{project_id}/batches/{batch_id}/confirm")
+async def confirm_ingestion_batch_uploads(
+    project_id: str,
+    batch_id: str,
+    batch_confirm_request: BatchConfirmRequest,
+    current_user_clerk_id: str = Depends(get_current_user_clerk_id),
+):
+    """
+    ! Logic Flow:
+    * 1. Select the pending files of the batch (all, or the given s3_keys)
+    * 2. Verify their uploads exist in S3 (head_object, concurrently) - files not uploaded stay pending
+    * 3. Update the uploaded files to "queued" and store their checksums (S3 ETag, for the dedup of later uploads)
+    * 4. Schedule the RAG Ingestion Tasks, with the task_ids stored at batch creation
+    * 5. Return the queued documents and the s3_keys still missing
+    """
+    set_project_id(project_id)
+    set_user_id(current_user_clerk_id)
+    try:
+        logger.info("confirming_ingestion_batch", batch_id=batch_id, s3_keys=len(batch_confirm_request.s3_keys) if batch_confirm_request.s3_keys is not None else None)
+        pending_documents_query = (
+            supabase.table("project_documents")
+            .select("id, s3_key")
+            .eq("batch_id", batch_id)
+            .eq("project_id", project_id)
+            .eq("clerk_id", current_user_clerk_id)
+            .eq("processing_status", ProcessingStatus.PENDING.value)
+        )
+        if batch_confirm_request.s3_keys is not None:
+            pending_documents_query = pending_documents_query.in_("s3_key", batch_confirm_request.s3_keys)
+        pending_documents = pending_documents_query.execute().data or []
+
+        # Only files whose upload really landed in S3 are queued, the others can be confirmed again later.
+        with ThreadPoolExecutor(max_workers=S3_HEAD_MAX_CONCURRENCY) as executor:
+            uploads = list(executor.map(head_s3_upload, [document["s3_key"] for document in pending_documents]))
+        uploaded_documents = [(document, checksum) for document, (uploaded, checksum) in zip(pending_documents, uploads) if uploaded]
+        missing_s3_keys = [document["s3_key"] for document, (uploaded, _) in zip(pending_documents, uploads) if not uploaded]
+
+        # One call for the whole batch; only pending documents are updated, so a repeated confirm queues nothing twice.
+        queued_documents = []
+        if uploaded_documents:
+            queued_documents_result = supabase.rpc(
+                "queue_uploaded_documents",
+                {
+                    "document_ids": [document["id"] for document, _ in uploaded_documents],
+                    "document_checksums": [checksum for _, checksum in uploaded_documents],
+                },
+            ).execute()
+            queued_documents = queued_documents_result.data or []
+        if queued_documents:
+            schedule_rag_ingestion(
+                [
+                    {"document_id": document["id"], "clerk_id": current_user_clerk_id, "cost": estimate_ingestion_cost(document), "task_id": document["task_id"]}
+                    for document in queued_documents
+                ]
+            )
+
+        logger.info("ingestion_batch_confirmed", batch_id=batch_id, queued_files=len(queued_documents), missing_uploads=len(missing_s3_keys))
+        return {
+            "message": f"Started Background Pre-Processing of {len(queued_documents)} files of the batch",
+            "data": queued_documents,
+            "missing_s3_keys": missing_s3_keys,
+        }
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.error("batch_confirmation_error", batch_id=batch_id, error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An internal server error occurred while confirming ingestion batch {batch_id} for {project_id}: {str(e)}",
+        )
+
+
+@router.get("/{project_id}/batches/{batch_id}")
+async def get_ingestion_batch_status(
+    project_id: str,
+    batch_id: str,
+    current_user_clerk_id: str = Depends(get_current_user_clerk_id),
+):
+    """
+    ! Logic Flow:
+    * 1. Select the documents of the batch (only the columns needed for the status)
+    * 2. Aggregate them : documents per processing_status, completed / failed / in progress counts and overall progress
+    * 3. Return the batch status and its documents
+    """
+    set_project_id(project_id)
+    set_user_id(current_user_clerk_id)
+    try:
+        batch_documents_result = (
+            supabase.table("project_documents")
+            .select("id, filename, source_type, processing_status, task_id, created_at")
+            .eq("batch_id", batch_id)
+            .eq("project_id", project_id)
+            .eq("clerk_id", current_user_clerk_id)
+            .order("created_at")
+            .execute()
+        )
+
+        batch_documents = batch_documents_result.data or []
+        if not batch_documents:
+            logger.warning("batch_not_found", batch_id=batch_id)
+            raise HTTPException(
+                status_code=404,
+                detail="Batch not found or you don't have permission to access this batch",
+            )
+
+        status_counts = {}
+        for document in batch_documents:
+            status_counts[document["processing_status"]] = status_counts.get(document["processing_status"], 0) + 1
+
+        total_documents = len(batch_documents)
+        completed_documents = status_counts.get(ProcessingStatus.COMPLETED.value, 0)
+        failed_documents = status_counts.get(ProcessingStatus.FAILED.value, 0)
+        waiting_documents = status_counts.get(ProcessingStatus.PENDING.value, 0) + status_counts.get(ProcessingStatus.QUEUED.value, 0)
+
+        logger.info("batch_status_retrieved", batch_id=batch_id, total_documents=total_documents, completed_documents=completed_documents)
+        return {
+            "message": "Batch status retrieved successfully",
+            "data": {
+                "batch_id": batch_id,
+                "total_documents": total_documents,
+                "completed_documents": completed_documents,
+                "failed_documents": failed_documents,
+                "processing_documents": total_documents - completed_documents - failed_documents - waiting_documents,
+                "waiting_documents": waiting_documents,
+                # Failed documents are finished too : progress and is_completed only wait for documents still in the pipeline.
+                "progress_percent": round(100.0 * (completed_documents + failed_documents) / total_documents, 1),
+                "status_counts": status_counts,
+                "is_completed": completed_documents + failed_documents == total_documents,
+                "documents": batch_documents,
+            },
+        }
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.error("batch_status_retrieval_error", batch_id=batch_id, error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An internal server error occurred while getting ingestion batch {batch_id} for {project_id}: {str(e)}",
+        )
+
+
+def build_document_s3_key(project_id: str, filename: str):
+    file_extension = filename.split(".")[-1] if "." in filename else ""
+    unique_file_id = uuid.uuid4()
+    return (
+        f"projects/{project_id}/documents/{unique_file_id}.{file_extension}"
+        if file_extension
+        else f"projects/{project_id}/documents/{unique_file_id}"
+    )
+
+
+def generate_upload_presigned_url(s3_key: str, file_type: str):
+    """Presigned PUT url for the frontend upload (will expire in 1 hour)."""
+    return s3_client.generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": appConfig["s3_bucket_name"],
+            "Key": s3_key,
+            "ContentType": file_type,
+        },
+        ExpiresIn=3600,  # 1 hour
+    )
+
+
+def normalize_url(url: str):
+    return url if url.startswith("http://") or url.startswith("https://") else f"https://{url}"
+
+
+def head_s3_upload(s3_key: str):
+    """(uploaded, checksum) of an upload, from one head_object call (see get_s3_object_checksum for the checksum)."""
+    try:
+        head_object_result = s3_client.head_object(Bucket=appConfig["s3_bucket_name"], Key=s3_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False, None
+        raise
+    etag = (head_object_result.get("ETag") or "").strip('"')
+    return True, f"etag:{etag}" if etag else None
+
+
+def get_s3_object_checksum(s3_key: str):
+    """
+    Checksum of an uploaded object from its S3 ETag (the MD5 of the content for single-part uploads, which is what
+    presigned PUT uploads are). Returns None if it cannot be read - dedup is then simply skipped.
+    """
+    try:
+        return head_s3_upload(s3_key)[1]
+    except Exception as e:
+        logger.warning("s3_checksum_failed", s3_key=s3_key, error=str(e))
+        return None
+
+
+def find_completed_document_with_checksum(checksum: str, project_id: str, clerk_id: str, exclude_document_id: str):
+    """Id of a completed document of the same project with the same checksum, or None."""
+    duplicate_document_result = (
+        supabase.table("project_documents")
+        .select("id")
+        .eq("project_id", project_id)
+        .eq("clerk_id", clerk_id)
+        .eq("checksum", checksum)
+        .eq("processing_status", ProcessingStatus.COMPLETED.value)
+        .neq("id", exclude_document_id)
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return duplicate_document_result.data[0]["id"] if duplicate_document_result.data else None
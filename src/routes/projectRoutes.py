@@ -8,6 +8,8 @@ from src.services.clerkAuth import get_current_user_clerk_id
 from src.models.index import ProjectCreate, ProjectSettings
 from src.models.index import MessageCreate, MessageRole
 from src.config.logging import get_logger, set_project_id, set_user_id
+from src.rag.ingestion.utils import forget_project_images
+from src.services.imageStore import delete_project_images, project_images_prefix
 
 from fastapi import APIRouter, Query
 from fastapi.responses import StreamingResponse
@@ -165,7 +167,8 @@ async def delete_project(
     * 2. Verify if the project exists and belongs to the current user
     * 3. Delete project - CASCADE will automatically delete all related data:
     * 4. Check if project deletion failed, then return error
-    * 5. Return successfully deleted project data
+    * 5. Drop the project-wide image dedup counts (Redis) and the project images (image store)
+    * 6. Return successfully deleted project data
     """
     set_project_id(project_id)
     set_user_id(current_user_clerk_id)
@@ -204,6 +207,17 @@ async def delete_project(
             )
 
         successfully_deleted_project = project_deletion_result.data[0]
+        forget_project_images(project_id)
+        # Images are shared by the documents of a project, so they are only deleted with the project itself - and kept
+        # while documents of other projects still reference them (deduplicated across projects before it was scoped).
+        try:
+            if project_images_referenced_elsewhere(project_id):
+                logger.info("project_images_kept", reason="referenced_by_other_projects")
+            else:
+                deleted_images = delete_project_images(project_id)
+                logger.info("project_images_deleted", image_count=deleted_images)
+        except Exception as e:
+            logger.warning("project_images_deletion_failed", error=str(e))
 
         logger.info("project_deleted_successfully")
         return {
@@ -453,6 +467,19 @@ async def update_project_settings(
             detail=f"An internal server error occurred while updating project {project_id} settings: {str(e)}",
         )
 
+def project_images_referenced_elsewhere(project_id: str) -> bool:
+    """Whether chunks still reference images of a project (called once the project and its chunks are deleted)."""
+    prefix = project_images_prefix(project_id)
+    referencing_chunk_result = (
+        supabase.table("document_chunks")
+        .select("id")
+        .or_(f"original_content->>image_keys.like.*{prefix}*,original_content->>boilerplate_image_keys.like.*{prefix}*")
+        .limit(1)
+        .execute()
+    )
+    return bool(referencing_chunk_result.data)
+
+
 def get_chat_history(chat_id: str, exclude_message_id: str = None) -> List[Dict[str, str]]:
     """
     Fetch and format chat history for agent context.
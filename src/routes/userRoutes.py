@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from src.services.supabase import supabase
-from src.config.logging import get_logger
+from src.services.clerkAuth import get_current_user_clerk_id
+from src.services.ingestionScheduler import get_tenant_queue_stats
+from src.config.logging import get_logger, set_user_id
 
 logger = get_logger(__name__)
 
@@ -88,3 +90,24 @@ async def create_user(clerk_webhook_data: dict):
             status_code=500,
             detail=f"Internal server error occurred while processing webhook {str(e)}",
         )
+
+
+@router.get("/ingestion-queue")
+async def get_ingestion_queue_stats(current_user_clerk_id: str = Depends(get_current_user_clerk_id)):
+    """
+    Logic Flow
+    * 1. Read the fair ingestion scheduler metrics of the current user (documents waiting, queue wait times)
+    * 2. Return the metrics
+    """
+    set_user_id(current_user_clerk_id)
+    try:
+        queue_stats = get_tenant_queue_stats(current_user_clerk_id)
+        logger.info("ingestion_queue_stats_retrieved", **queue_stats)
+        return {"message": "Ingestion queue stats retrieved successfully", "data": queue_stats}
+
+    except Exception as e:
+        logger.error("ingestion_queue_stats_error", error=str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error occurred while getting ingestion queue stats {str(e)}",
+        )
@@ -5,6 +5,8 @@ from src.routes.projectRoutes import router as projectRoutes
 from src.routes.projectFilesRoutes import router as projectFilesRoutes
 from src.routes.chatRoutes import router as chatRoutes
 from src.config.logging import configure_logging, get_logger
+from src.services.embeddingCache import get_embedding_cache_stats
+from src.services.queryEmbeddingCache import get_query_embedding_cache_stats
 from src.middleware.logging_middleware import LoggingMiddleware
 
 # Configure logging before anything else
@@ -47,4 +49,12 @@ async def health_check():
     logger.debug("health_check_called")
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/metrics/caches")
+async def cache_metrics():
+    """Hit / miss counters and hit rates of the caches (aggregate counters only, no user data)."""
+    return {
+        "embedding_cache": get_embedding_cache_stats(),
+        "query_embedding_cache": get_query_embedding_cache_stats(),
+    }
+
 logger.info("application_ready")
@@ -1,12 +1,23 @@
-from celery import Celery
-from celery.signals import task_prerun, task_postrun, task_failure, worker_process_init
+import uuid
+from celery import Celery, chain, group
+from celery.signals import task_prerun, task_postrun, task_failure, worker_init, worker_process_init
 from src.config.index import appConfig
 from src.config.logging import configure_logging, get_logger, set_request_id, clear_context
 
 # Configure logging for Celery worker with dedicated log file
 configure_logging(log_filename="worker.log")
 
-from src.rag.ingestion.index import process_document
+from src.rag.ingestion.index import partition_and_chunk_document, summarise_vectorize_and_store_document, mark_document_failed
+from src.rag.ingestion.utils import delete_stage_outputs
+from src.services.ingestionScheduler import enqueue_ingestion_jobs, take_dispatchable_jobs, renew_ingestion_lease, release_ingestion_slot, reap_expired_ingestion_leases
+from src.services.rateLimiter import PRIORITY_INGESTION, set_default_rate_limit_priority
+
+INGESTION_CPU_QUEUE = "ingestion_cpu"
+INGESTION_IO_QUEUE = "ingestion_io"
+
+# Stage tasks are retried with backoff (30s, 60s, 120s); each retry continues from the stage checkpoints in S3.
+INGESTION_TASK_MAX_RETRIES = 3
+INGESTION_TASK_RETRY_BACKOFF_SECONDS = 30
 
 celery_app = Celery(
     "multi-modal-rag",  # Name of the Celery App
@@ -20,10 +31,35 @@ celery_app.conf.update(
     worker_task_log_format='%(message)s',  # Same for task logs
     worker_redirect_stdouts=False,  # Don't redirect stdout/stderr
     worker_redirect_stdouts_level='WARNING',  # If redirected, use WARNING level
+    # Ingestion stages run on dedicated queues so each resource type scales on its own (see start_worker.sh) :
+    #   - ingestion_cpu : partitioning + chunking, CPU-bound -> threads pool, low concurrency : the PDF page ranges of
+    #                     a document are partitioned in a spawned process pool, which daemonic prefork children cannot start
+    #   - ingestion_io  : summarise / embed / store, waits on OpenAI + Supabase -> threads pool, high concurrency
+    task_routes={
+        "src.services.celery.partition_document_task": {"queue": INGESTION_CPU_QUEUE},
+        "src.services.celery.summarise_vectorize_store_task": {"queue": INGESTION_IO_QUEUE},
+        "src.services.celery.perform_rag_ingestion_task": {"queue": INGESTION_IO_QUEUE},
+        "src.services.celery.dispatch_rag_ingestion_jobs_task": {"queue": INGESTION_IO_QUEUE},
+    },
+    # Celery beat (./start_worker.sh beat) : the scheduler also dispatches when no document is enqueued or finishes,
+    # so slots freed by crashed workers (expired leases) are reused.
+    beat_schedule={
+        "dispatch-rag-ingestion-jobs": {
+            "task": "src.services.celery.dispatch_rag_ingestion_jobs_task",
+            "schedule": appConfig["ingestion_dispatch_interval_seconds"],
+        },
+    },
 )
 
+@worker_init.connect
+def init_worker(sender=None, **kwargs):
+    # Everything a worker sends to OpenAI is ingestion traffic : it yields to interactive chat in the rate limiter.
+    set_default_rate_limit_priority(PRIORITY_INGESTION)
+
+
 @worker_process_init.connect
 def init_worker_process(sender=None, **kwargs):
+    set_default_rate_limit_priority(PRIORITY_INGESTION)
     logger = get_logger(__name__)
     logger.info("celery_worker_started", worker_name=sender)
 
@@ -50,15 +86,121 @@ def task_failure_handler(task_id=None, exception=None, sender=None, **_kwargs):
 
 
 @celery_app.task
-def perform_rag_ingestion_task(document_id: str):
+def perform_rag_ingestion_task(document_id: str, incremental: bool = False, resume: bool = False):
+    """
+    Entry point of the ingestion pipeline (sent by the fair scheduler, see schedule_rag_ingestion) : queues the stage
+    tasks as a chain and returns.
+        partition_document_task (ingestion_cpu) --[chunks checkpoint in S3]--> summarise_vectorize_store_task (ingestion_io)
+    resume=True continues from the checkpoints of a previous (failed) run, otherwise they are dropped first.
+    """
+    logger = get_logger(__name__)
+    logger.info("processing_document", document_id=document_id, incremental=incremental, resume=resume)
+    try:
+        if not resume:
+            delete_stage_outputs(document_id)
+        pipeline_result = chain(
+            partition_document_task.s(document_id, incremental),
+            summarise_vectorize_store_task.s(),
+        ).apply_async()
+    except Exception as e:
+        # No stage task will run : free the ingestion slot now instead of waiting for its lease to expire.
+        logger.error("document_processing_failed", document_id=document_id, error=str(e), exc_info=True)
+        mark_document_failed(document_id, str(e))
+        finish_rag_ingestion(document_id)
+        raise
+    logger.info("ingestion_pipeline_queued", document_id=document_id, pipeline_task_id=pipeline_result.id)
+    return f"Document {document_id} ingestion pipeline queued"
+
+
+@celery_app.task
+def dispatch_rag_ingestion_jobs_task():
+    """
+    Periodic (Celery beat) : reap the slots of ingestions whose worker died (lease expired - marked as failed), then
+    dispatch the scheduled documents that fit in the free slots.
+    """
+    logger = get_logger(__name__)
+    for document_id in reap_expired_ingestion_leases():
+        logger.warning("ingestion_lease_expired", document_id=document_id)
+        mark_document_failed(document_id, "Ingestion stopped responding (worker lost), reprocess the document to retry")
+    dispatched_jobs = dispatch_rag_ingestion_jobs()
+    return f"Dispatched {len(dispatched_jobs)} documents"
+
+
+def schedule_rag_ingestion(jobs):
+    """
+    Queue documents in the fair ingestion scheduler (see src/services/ingestionScheduler.py) instead of sending them to
+    Celery directly, then dispatch whatever fits in the free ingestion slots.
+    jobs : [{"document_id", "clerk_id", "cost", "task_id" (optional), "incremental" (optional), "resume" (optional)}, ...]
+    Returns the task id of every job (generated up front unless given), to be stored with the documents.
+    """
+    jobs = [{"task_id": str(uuid.uuid4()), "incremental": False, "resume": False, **job} for job in jobs]
+    enqueue_ingestion_jobs(jobs)
+    dispatch_rag_ingestion_jobs()
+    return [job["task_id"] for job in jobs]
+
+
+def dispatch_rag_ingestion_jobs():
+    """Send the next scheduled documents to Celery (one group), as many as there are free ingestion slots."""
+    dispatched_jobs = take_dispatchable_jobs()
+    if dispatched_jobs:
+        group(
+            perform_rag_ingestion_task.s(job["document_id"], job["incremental"], job["resume"]).set(task_id=job["task_id"])
+            for job in dispatched_jobs
+        ).apply_async()
+    return dispatched_jobs
+
+
+def finish_rag_ingestion(document_id: str):
+    """Free the ingestion slot of a document (completed or failed for good) and dispatch the next scheduled documents."""
+    try:
+        release_ingestion_slot(document_id)
+        dispatch_rag_ingestion_jobs()
+    except Exception as e:
+        # The slot lease expires on its own, and the periodic dispatch (Celery beat) picks the queue up again.
+        get_logger(__name__).warning("ingestion_dispatch_failed", document_id=document_id, error=str(e))
+
+
+def retry_ingestion_stage(task, document_id: str, error: Exception):
+    """Retry a stage task with exponential backoff; returns False once the retries are exhausted."""
+    if task.request.retries >= task.max_retries:
+        return False
+    wait_time = INGESTION_TASK_RETRY_BACKOFF_SECONDS * 2**task.request.retries
+    get_logger(__name__).warning("ingestion_stage_retry", document_id=document_id, task_name=task.name, attempt=task.request.retries + 1, wait_seconds=wait_time, error=str(error))
+    raise task.retry(exc=error, countdown=wait_time)
+
+
+@celery_app.task(bind=True, max_retries=INGESTION_TASK_MAX_RETRIES)
+def partition_document_task(self, document_id: str, incremental: bool = False):
+    """Step 1 + 2 (download, partition, chunk). The prepared chunks are handed over through the S3 chunks checkpoint."""
+    logger = get_logger(__name__)
+    renew_ingestion_lease(document_id)
+    try:
+        partition_and_chunk_document(document_id, incremental=incremental)
+        return document_id
+    except Exception as e:
+        retry_ingestion_stage(self, document_id, e)
+        logger.error("document_processing_failed", document_id=document_id, error=str(e), exc_info=True)
+        mark_document_failed(document_id, str(e))
+        finish_rag_ingestion(document_id)
+        # Raising stops the chain : the next stage must not run without chunks.
+        raise
+
+
+@celery_app.task(bind=True, max_retries=INGESTION_TASK_MAX_RETRIES)
+def summarise_vectorize_store_task(self, document_id: str):
+    """Step 3 + 4 (summarise, embed, store) of the chunks checkpointed by partition_document_task."""
     logger = get_logger(__name__)
-    logger.info("processing_document", document_id=document_id)
+    renew_ingestion_lease(document_id)
     try:
-        process_document_result = process_document(document_id)
+        process_document_result = summarise_vectorize_and_store_document(document_id)
         logger.info("document_processed_successfully", document_id=process_document_result.get("document_id"), chunks_created=process_document_result.get("chunks_created"))
+        finish_rag_ingestion(document_id)
         return (
             f"Document {process_document_result['document_id']} processed successfully"
         )
     except Exception as e:
+        retry_ingestion_stage(self, document_id, e)
         logger.error("document_processing_failed", document_id=document_id, error=str(e), exc_info=True)
+        mark_document_failed(document_id, str(e))
+        finish_rag_ingestion(document_id)
         return f"Failed to process document {document_id}: {str(e)}"
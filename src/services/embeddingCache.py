@@ -0,0 +1,112 @@
+import hashlib
+import time
+from array import array
+from typing import List, Optional
+
+from src.config.index import appConfig
+from src.config.logging import get_logger
+from src.services.llm import openAI
+from src.services.redis import redis_client
+
+logger = get_logger(__name__)
+
+# Persistent embedding cache (Redis).
+#
+#   - Key : `embedding_cache:{model}:{dimensions}:{sha256(text)}` -> float32 packed vector (6KB for 1536 dims)
+#   - `embedding_cache:lru` : sorted set of keys scored by last access time, used to evict the least recently used
+#     entries once the cache grows past `embedding_cache_max_entries`.
+#   - `embedding_cache:stats` : hash with the hit / miss counters.
+#
+# The cache is an optimization only, every Redis error is logged and treated as a miss.
+
+EMBEDDING_CACHE_PREFIX = "embedding_cache"
+EMBEDDING_CACHE_LRU_KEY = f"{EMBEDDING_CACHE_PREFIX}:lru"
+EMBEDDING_CACHE_STATS_KEY = f"{EMBEDDING_CACHE_PREFIX}:stats"
+
+
+def embedding_cache_key(text: str) -> str:
+    embeddings = openAI["embeddings"]
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{EMBEDDING_CACHE_PREFIX}:{embeddings.model}:{embeddings.dimensions}:{text_hash}"
+
+
+def pack_embedding(embedding: List[float]) -> bytes:
+    # float32 is what pgvector stores anyway, so nothing is lost compared to the vector column.
+    return array("f", embedding).tobytes()
+
+
+def unpack_embedding(raw: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(raw)
+    return vector.tolist()
+
+
+def get_cached_embeddings(texts: List[str]) -> List[Optional[List[float]]]:
+    """Return the cached embedding for each text (None for a miss), in the same order as texts."""
+    if not texts:
+        return []
+
+    try:
+        keys = [embedding_cache_key(text) for text in texts]
+        raw_values = redis_client.mget(keys)
+        embeddings = [unpack_embedding(raw) if raw else None for raw in raw_values]
+
+        hits = [key for key, embedding in zip(keys, embeddings) if embedding is not None]
+        pipeline = redis_client.pipeline(transaction=False)
+        if hits:
+            pipeline.zadd(EMBEDDING_CACHE_LRU_KEY, {key: time.time() for key in hits})
+            pipeline.hincrby(EMBEDDING_CACHE_STATS_KEY, "hits", len(hits))
+        if len(hits) < len(keys):
+            pipeline.hincrby(EMBEDDING_CACHE_STATS_KEY, "misses", len(keys) - len(hits))
+        pipeline.execute()
+
+        return embeddings
+    except Exception as e:
+        logger.warning("embedding_cache_read_failed", error=str(e))
+        return [None] * len(texts)
+
+
+def set_cached_embeddings(texts: List[str], embeddings: List[List[float]]) -> None:
+    """Store embeddings for texts and evict the least recently used entries beyond the size bound."""
+    if not texts:
+        return
+
+    try:
+        now = time.time()
+        pipeline = redis_client.pipeline(transaction=False)
+        lru_scores = {}
+        for text, embedding in zip(texts, embeddings):
+            key = embedding_cache_key(text)
+            pipeline.set(key, pack_embedding(embedding))
+            lru_scores[key] = now
+        pipeline.zadd(EMBEDDING_CACHE_LRU_KEY, lru_scores)
+        pipeline.execute()
+
+        evict_embedding_cache()
+    except Exception as e:
+        logger.warning("embedding_cache_write_failed", error=str(e))
+
+
+def evict_embedding_cache() -> int:
+    """Drop the least recently used entries above `embedding_cache_max_entries`. Returns the number evicted."""
+    overflow = redis_client.zcard(EMBEDDING_CACHE_LRU_KEY) - appConfig["embedding_cache_max_entries"]
+    if overflow <= 0:
+        return 0
+
+    evicted_keys = [key for key, _score in redis_client.zpopmin(EMBEDDING_CACHE_LRU_KEY, overflow)]
+    if evicted_keys:
+        redis_client.delete(*evicted_keys)
+        redis_client.hincrby(EMBEDDING_CACHE_STATS_KEY, "evictions", len(evicted_keys))
+    return len(evicted_keys)
+
+
+def get_embedding_cache_stats() -> dict:
+    try:
+        stats = {key.decode(): int(value) for key, value in redis_client.hgetall(EMBEDDING_CACHE_STATS_KEY).items()}
+        stats["entries"] = redis_client.zcard(EMBEDDING_CACHE_LRU_KEY)
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = round(stats.get("hits", 0) / lookups, 4) if lookups else 0.0
+        return stats
+    except Exception as e:
+        logger.warning("embedding_cache_stats_failed", error=str(e))
+        return {}
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+
+from src.config.index import appConfig
+from src.config.logging import get_logger
+from src.services.awsS3 import s3_client
+
+logger = get_logger(__name__)
+
+# Extracted images live in S3 under content-hash keys, chunk rows only keep the keys (`original_content.image_keys`).
+#
+#   - Key : `projects/{project_id}/images/{sha256}.jpg` - identical images of a project are stored once.
+#   - Retrieval loads them lazily (load_images_base64, in-process LRU). The chunk viewer gets stable urls
+#     (`/api/projects/{project_id}/images/{sha256}`, see get_image_url) served with long-lived cache headers : the
+#     object behind a key never changes, so browsers cache every image once.
+#   - Cleanup : an image can be shared by every document of its project (same content, same key), so deleting a
+#     document keeps its images; they are deleted with the project (delete_project_images). Documents are only
+#     deduplicated within their project, projects still referenced by older cross-project clones keep their images.
+
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+IMAGE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def project_images_prefix(project_id: str) -> str:
+    return f"projects/{project_id}/images/"
+
+
+def image_key(project_id: str, image_hash: str) -> str:
+    return f"{project_images_prefix(project_id)}{image_hash}.jpg"
+
+
+def build_image_key(project_id: str, image_bytes: bytes) -> str:
+    return image_key(project_id, hashlib.sha256(image_bytes).hexdigest())
+
+
+def store_image(project_id: str, image_base64: str) -> str:
+    """Upload an image (base64 JPEG) unless an identical one is stored already. Returns its key."""
+    image_bytes = base64.b64decode(image_base64)
+    key = build_image_key(project_id, image_bytes)
+    try:
+        s3_client.head_object(Bucket=appConfig["s3_bucket_name"], Key=key)
+        return key
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            raise
+
+    s3_client.put_object(
+        Bucket=appConfig["s3_bucket_name"],
+        Key=key,
+        Body=image_bytes,
+        ContentType="image/jpeg",
+        CacheControl=IMAGE_CACHE_CONTROL,
+    )
+    return key
+
+
+@lru_cache(maxsize=appConfig["image_cache_max_entries"])
+def load_image_bytes(key: str) -> bytes:
+    response = s3_client.get_object(Bucket=appConfig["s3_bucket_name"], Key=key)
+    return response["Body"].read()
+
+
+def load_image_base64(key: str) -> str:
+    return base64.b64encode(load_image_bytes(key)).decode("ascii")
+
+
+def load_images_base64(keys: List[str]) -> List[Optional[str]]:
+    """Fetch images (cached ones from memory) concurrently. One entry per key, in order - None for an image that failed to load."""
+    if not keys:
+        return []
+
+    def load(key):
+        try:
+            return load_image_base64(key)
+        except Exception as e:
+            logger.warning("image_load_failed", key=key, error=str(e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(8, len(keys))) as executor:
+        return list(executor.map(load, keys))
+
+
+def get_image_url(key: str) -> str:
+    """
+    Stable url of an image for the frontend (GET /api/projects/{project_id}/images/{sha256}). Unlike a presigned url it
+    is the same on every chunk listing, so the browser cache (immutable) actually gets hits.
+    """
+    project_id, _, filename = key[len("projects/"):].partition("/images/")
+    return f"/api/projects/{project_id}/images/{filename.rsplit('.', 1)[0]}"
+
+
+def delete_project_images(project_id: str) -> int:
+    """Delete every image of a project (batches of 1000 keys per request). Returns the number deleted."""
+    deleted = 0
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=appConfig["s3_bucket_name"], Prefix=project_images_prefix(project_id)):
+        objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+        if objects:
+            s3_client.delete_objects(Bucket=appConfig["s3_bucket_name"], Delete={"Objects": objects, "Quiet": True})
+            deleted += len(objects)
+    return deleted
@@ -0,0 +1,216 @@
+import json
+import time
+
+from src.config.index import appConfig
+from src.config.logging import get_logger
+from src.services.redis import broker_redis_client
+
+logger = get_logger(__name__)
+
+# Fair ingestion scheduler (Redis), in front of the ingestion Celery tasks.
+#
+# Documents are not sent to Celery straight away : they wait in a queue per tenant (clerk_id) and at most
+# `ingestion_max_in_flight` documents are ingested at the same time. Whenever a slot frees up, the next document is picked :
+#
+#   - Across tenants : start-time fair queuing. Every tenant has a virtual time that grows by the cost of each document
+#     dispatched for it, the tenant with the lowest virtual time goes next. A tenant uploading a 2,000-page archive is
+#     charged 2,000 pages, so the small documents of every other tenant pass it.
+#   - Within a tenant : smallest job first, with aging (score = enqueued_at + cost * SECONDS_PER_COST_UNIT) so a big
+#     document is not overtaken forever.
+#
+# Cost = estimated pages (page count of a previous ingestion, else file size / ESTIMATED_BYTES_PER_PAGE, URLs count 1).
+#
+# Keys (broker Redis) :
+#   - `ingestion_scheduler:tenants`             : sorted set clerk_id -> virtual time (tenants with queued documents)
+#   - `ingestion_scheduler:queue:{clerk_id}`    : sorted set document_id -> score
+#   - `ingestion_scheduler:jobs`                : hash document_id -> job (json)
+#   - `ingestion_scheduler:in_flight`           : sorted set document_id -> lease expiry, renewed by the progress
+#                                                 writes of the document. A crashed worker stops renewing : the periodic
+#                                                 dispatch (Celery beat) reaps the expired lease and frees the slot.
+#   - `ingestion_scheduler:wait_stats:{clerk_id}` : hash with queue wait metrics (dispatched, total / max / last wait)
+
+SCHEDULER_PREFIX = "ingestion_scheduler"
+TENANTS_KEY = f"{SCHEDULER_PREFIX}:tenants"
+TENANT_QUEUE_PREFIX = f"{SCHEDULER_PREFIX}:queue:"
+JOBS_KEY = f"{SCHEDULER_PREFIX}:jobs"
+IN_FLIGHT_KEY = f"{SCHEDULER_PREFIX}:in_flight"
+CLOCK_KEY = f"{SCHEDULER_PREFIX}:clock"
+TENANT_VIRTUAL_TIME_KEY = f"{SCHEDULER_PREFIX}:tenant_virtual_time"
+WAIT_STATS_PREFIX = f"{SCHEDULER_PREFIX}:wait_stats:"
+
+ESTIMATED_BYTES_PER_PAGE = 100 * 1024
+SECONDS_PER_COST_UNIT = 2.0
+
+# KEYS : tenants, jobs, tenant queue, clock, tenant virtual times
+# ARGV : clerk_id, document_id, job (json), score
+ENQUEUE_SCRIPT = """
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[2])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    -- A tenant becoming active starts at the current clock : idle time is not banked as credit.
+    local clock = tonumber(redis.call('GET', KEYS[4]) or '0')
+    local last_virtual_time = tonumber(redis.call('HGET', KEYS[5], ARGV[1]) or '0')
+    redis.call('ZADD', KEYS[1], math.max(clock, last_virtual_time), ARGV[1])
+end
+return 1
+"""
+
+# KEYS : tenants, jobs, in flight, clock, tenant virtual times
+# ARGV : now, max in flight, lease seconds, tenant queue prefix
+# Returns the jobs (json) to send to Celery now.
+DISPATCH_SCRIPT = """
+local now = tonumber(ARGV[1])
+local max_in_flight = tonumber(ARGV[2])
+local lease_seconds = tonumber(ARGV[3])
+local dispatched = {}
+
+-- Expired leases are left to REAP_SCRIPT : it frees their slots AND reports them so their documents are marked failed.
+while redis.call('ZCARD', KEYS[3]) < max_in_flight do
+    local tenant = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if #tenant == 0 then
+        break
+    end
+    local clerk_id = tenant[1]
+    local virtual_time = tonumber(tenant[2])
+    local tenant_queue = ARGV[4] .. clerk_id
+
+    local queued = redis.call('ZPOPMIN', tenant_queue)
+    if #queued == 0 then
+        redis.call('ZREM', KEYS[1], clerk_id)
+    else
+        local document_id = queued[1]
+        local job = redis.call('HGET', KEYS[2], document_id)
+        redis.call('HDEL', KEYS[2], document_id)
+        if job then
+            local next_virtual_time = virtual_time + tonumber(cjson.decode(job)['cost'])
+            redis.call('SET', KEYS[4], virtual_time)
+            redis.call('HSET', KEYS[5], clerk_id, next_virtual_time)
+            if redis.call('ZCARD', tenant_queue) == 0 then
+                redis.call('ZREM', KEYS[1], clerk_id)
+            else
+                redis.call('ZADD', KEYS[1], next_virtual_time, clerk_id)
+            end
+            redis.call('ZADD', KEYS[3], now + lease_seconds, document_id)
+            table.insert(dispatched, job)
+        end
+    end
+end
+
+return dispatched
+"""
+
+# KEYS : in flight
+# ARGV : now
+# Returns the document ids whose lease expired, removed from the in-flight set.
+REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+end
+return expired
+"""
+
+_enqueue = broker_redis_client.register_script(ENQUEUE_SCRIPT)
+_dispatch = broker_redis_client.register_script(DISPATCH_SCRIPT)
+_reap = broker_redis_client.register_script(REAP_SCRIPT)
+
+
+def estimate_ingestion_cost(document: dict) -> int:
+    """Estimated pages of a project document (a previous ingestion's page count is exact, file size is a rough guess)."""
+    if document.get("source_type") == "url":
+        return 1
+
+    page_strategies = ((document.get("processing_details") or {}).get("partitioning") or {}).get("page_strategies") or {}
+    known_pages = sum(last_page - first_page + 1 for page_ranges in page_strategies.values() for first_page, last_page in page_ranges)
+    if known_pages:
+        return known_pages
+
+    return max(1, int((document.get("file_size") or 0) / ESTIMATED_BYTES_PER_PAGE))
+
+
+def enqueue_ingestion_jobs(jobs) -> None:
+    """
+    Queue documents for ingestion (one round trip). job = {"document_id", "clerk_id", "task_id", "cost", "incremental", "resume"}.
+    Queuing a document that is already waiting replaces its job.
+    """
+    pipeline = broker_redis_client.pipeline(transaction=False)
+    for job in jobs:
+        job = {**job, "enqueued_at": time.time()}
+        score = job["enqueued_at"] + job["cost"] * SECONDS_PER_COST_UNIT
+        _enqueue(
+            keys=[TENANTS_KEY, JOBS_KEY, f"{TENANT_QUEUE_PREFIX}{job['clerk_id']}", CLOCK_KEY, TENANT_VIRTUAL_TIME_KEY],
+            args=[job["clerk_id"], job["document_id"], json.dumps(job), score],
+            client=pipeline,
+        )
+    pipeline.execute()
+    logger.info("ingestion_jobs_enqueued", documents=len(jobs), total_cost=sum(job["cost"] for job in jobs))
+
+
+def take_dispatchable_jobs():
+    """Pop the jobs that fit in the free slots (in scheduling order), lease their slots and record their queue wait."""
+    now = time.time()
+    dispatched_jobs = [
+        json.loads(job)
+        for job in _dispatch(
+            keys=[TENANTS_KEY, JOBS_KEY, IN_FLIGHT_KEY, CLOCK_KEY, TENANT_VIRTUAL_TIME_KEY],
+            args=[now, appConfig["ingestion_max_in_flight"], appConfig["ingestion_lease_seconds"], TENANT_QUEUE_PREFIX],
+        )
+    ]
+
+    if dispatched_jobs:
+        pipeline = broker_redis_client.pipeline(transaction=False)
+        for job in dispatched_jobs:
+            wait_seconds = round(now - job["enqueued_at"], 3)
+            wait_stats_key = f"{WAIT_STATS_PREFIX}{job['clerk_id']}"
+            pipeline.hincrby(wait_stats_key, "dispatched", 1)
+            pipeline.hincrbyfloat(wait_stats_key, "total_wait_seconds", wait_seconds)
+            pipeline.hset(wait_stats_key, "last_wait_seconds", wait_seconds)
+            # Redis has no HMAX : max_wait_seconds is updated below from the pipeline results.
+            pipeline.hget(wait_stats_key, "max_wait_seconds")
+            logger.info("ingestion_job_dispatched", document_id=job["document_id"], clerk_id=job["clerk_id"], cost=job["cost"], wait_seconds=wait_seconds)
+        results = pipeline.execute()
+
+        for job, current_max in zip(dispatched_jobs, results[3::4]):
+            wait_seconds = now - job["enqueued_at"]
+            if current_max is None or wait_seconds > float(current_max):
+                broker_redis_client.hset(f"{WAIT_STATS_PREFIX}{job['clerk_id']}", "max_wait_seconds", round(wait_seconds, 3))
+
+    return dispatched_jobs
+
+
+def renew_ingestion_lease(document_id: str) -> None:
+    """Extend the slot lease of a document that is being ingested (start of every stage task + every progress write)."""
+    try:
+        broker_redis_client.zadd(IN_FLIGHT_KEY, {document_id: time.time() + appConfig["ingestion_lease_seconds"]}, xx=True)
+    except Exception as e:
+        logger.warning("ingestion_lease_renewal_failed", document_id=document_id, error=str(e))
+
+
+def release_ingestion_slot(document_id: str) -> None:
+    broker_redis_client.zrem(IN_FLIGHT_KEY, document_id)
+
+
+def reap_expired_ingestion_leases():
+    """Free the slots whose lease expired (worker killed, OOM...) and return their document ids."""
+    return [document_id.decode() for document_id in _reap(keys=[IN_FLIGHT_KEY], args=[time.time()])]
+
+
+def get_tenant_queue_stats(clerk_id: str) -> dict:
+    """Queue metrics of a tenant : documents waiting and queue wait times of the dispatched ones."""
+    pipeline = broker_redis_client.pipeline(transaction=False)
+    pipeline.zcard(f"{TENANT_QUEUE_PREFIX}{clerk_id}")
+    pipeline.hgetall(f"{WAIT_STATS_PREFIX}{clerk_id}")
+    pipeline.zcard(IN_FLIGHT_KEY)
+    queued_documents, wait_stats, in_flight = pipeline.execute()
+
+    wait_stats = {key.decode(): float(value) for key, value in wait_stats.items()}
+    dispatched = int(wait_stats.get("dispatched", 0))
+    return {
+        "queued_documents": queued_documents,
+        "dispatched_documents": dispatched,
+        "average_wait_seconds": round(wait_stats.get("total_wait_seconds", 0.0) / dispatched, 3) if dispatched else 0.0,
+        "max_wait_seconds": wait_stats.get("max_wait_seconds", 0.0),
+        "last_wait_seconds": wait_stats.get("last_wait_seconds", 0.0),
+        "documents_in_flight": in_flight,
+        "max_in_flight": appConfig["ingestion_max_in_flight"],
+    }
@@ -1,19 +1,44 @@
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from src.config.index import appConfig
+from src.services.rateLimiter import RedisRateLimiter, TokenUsageRecorder, acquire, estimate_tokens
+
+
+class RateLimitedOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings that acquires from the cluster-wide rate limiter before every request."""
+
+    def embed_documents(self, texts, chunk_size=None, **kwargs):
+        acquire(self.model, sum(estimate_tokens(text) for text in texts))
+        return super().embed_documents(texts, chunk_size=chunk_size, **kwargs)
+
+
+def create_chat_llm(model: str, estimated_tokens: int) -> ChatOpenAI:
+    """ChatOpenAI limited by the cluster-wide rate limiter (estimated_tokens : typical prompt + completion size)."""
+    return ChatOpenAI(
+        model=model,
+        api_key=appConfig["openai_api_key"],
+        temperature=0,
+        rate_limiter=RedisRateLimiter(model, estimated_tokens),
+        callbacks=[TokenUsageRecorder(model, estimated_tokens)],
+    )
+
 
 openAI = {
-    "embeddings_llm": ChatOpenAI(
-        model="gpt-4-turbo", api_key=appConfig["openai_api_key"], temperature=0
-    ),
-    "embeddings": OpenAIEmbeddings(
+    "embeddings_llm": create_chat_llm("gpt-4-turbo", estimated_tokens=3000),
+    "embeddings": RateLimitedOpenAIEmbeddings(
         model="text-embedding-3-large",
         api_key=appConfig["openai_api_key"],
         dimensions=1536,  # ! Do not changes this value. It is used in the document_chunks embedding vector.
+        # Query embeddings (retrieval) : bounded like the search they belong to, one retry.
+        timeout=appConfig["retrieval_search_timeout_seconds"],
+        max_retries=1,
     ),
-    "chat_llm": ChatOpenAI(
-        model="gpt-4o", api_key=appConfig["openai_api_key"], temperature=0
-    ),
-    "mini_llm": ChatOpenAI(
-        model="gpt-4o-mini", api_key=appConfig["openai_api_key"], temperature=0
+    # Same model for ingestion, without the client's own retries : the EmbeddingBatcher handles 429s / retry-after itself.
+    "ingestion_embeddings": RateLimitedOpenAIEmbeddings(
+        model="text-embedding-3-large",
+        api_key=appConfig["openai_api_key"],
+        dimensions=1536,  # ! Must match "embeddings" above.
+        max_retries=0,
     ),
+    "chat_llm": create_chat_llm("gpt-4o", estimated_tokens=4000),
+    "mini_llm": create_chat_llm("gpt-4o-mini", estimated_tokens=1500),
 }
@@ -0,0 +1,169 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+from src.config.index import appConfig
+from src.config.logging import get_logger
+from src.services.embeddingCache import pack_embedding, unpack_embedding
+from src.services.llm import openAI
+from src.services.redis import redis_client
+
+logger = get_logger(__name__)
+
+# Two-tier cache of retrieval query embeddings (repeated FAQ questions, agent retries, the same rag_search query...).
+#
+#   - Tier 1 : in-process LRU (`query_embedding_cache_max_entries` entries), no network at all.
+#   - Tier 2 : Redis, shared by every API pod - `query_embedding_cache:{model}:{dimensions}:{sha256(normalized query)}`
+#     -> float32 packed vector, expiring after `query_embedding_cache_ttl_seconds` (entries of tier 1 expire with it).
+#   - `query_embedding_cache:stats` : hash with the local_hits / redis_hits / misses counters (see get_query_embedding_cache_stats).
+#     The counters ride along the next lookup / write pipeline instead of costing a round trip of their own, so the
+#     cluster view lags this process by a few lookups (a lookup fully served by tier 1 sends nothing, its counts go
+#     with the next pipeline).
+#
+# Queries are normalized (unicode NFKC, case folded, whitespace collapsed) before being hashed. Like the ingestion
+# embedding cache, every Redis error is logged and treated as a miss.
+
+QUERY_EMBEDDING_CACHE_PREFIX = "query_embedding_cache"
+QUERY_EMBEDDING_CACHE_STATS_KEY = f"{QUERY_EMBEDDING_CACHE_PREFIX}:stats"
+
+local_cache = OrderedDict()  # key -> (expires_at, embedding)
+local_cache_lock = threading.Lock()
+local_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+pending_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}  # not yet sent to Redis
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def query_embedding_cache_key(query: str) -> str:
+    embeddings = openAI["embeddings"]
+    query_hash = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+    return f"{QUERY_EMBEDDING_CACHE_PREFIX}:{embeddings.model}:{embeddings.dimensions}:{query_hash}"
+
+
+def get_local(key: str) -> Optional[List[float]]:
+    with local_cache_lock:
+        entry = local_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, embedding = entry
+        if expires_at <= time.time():
+            del local_cache[key]
+            return None
+        local_cache.move_to_end(key)
+        return embedding
+
+
+def set_local(key: str, embedding: List[float], ttl_seconds: float) -> None:
+    with local_cache_lock:
+        local_cache[key] = (time.time() + ttl_seconds, embedding)
+        local_cache.move_to_end(key)
+        while len(local_cache) > appConfig["query_embedding_cache_max_entries"]:
+            local_cache.popitem(last=False)
+
+
+def record_stats(stats: dict) -> None:
+    with local_cache_lock:
+        for counter, count in stats.items():
+            local_stats[counter] += count
+            pending_stats[counter] += count
+
+
+def queue_pending_stats(pipeline) -> dict:
+    """Append the pending counters to a pipeline about to be sent. Returns them, to put back if it fails."""
+    with local_cache_lock:
+        queued = dict(pending_stats)
+        pending_stats.update(dict.fromkeys(pending_stats, 0))
+    for counter, count in queued.items():
+        if count:
+            pipeline.hincrby(QUERY_EMBEDDING_CACHE_STATS_KEY, counter, count)
+    return queued
+
+
+def restore_pending_stats(queued: dict) -> None:
+    with local_cache_lock:
+        for counter, count in queued.items():
+            pending_stats[counter] += count
+
+
+def get_cached_query_embeddings(queries: List[str]) -> List[Optional[List[float]]]:
+    """Return the cached embedding of each query (None for a miss), in the same order as queries."""
+    if not queries:
+        return []
+
+    keys = [query_embedding_cache_key(query) for query in queries]
+    embeddings = [get_local(key) for key in keys]
+    local_hits = sum(embedding is not None for embedding in embeddings)
+
+    redis_hits = 0
+    missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        queued_stats = {}
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for index in missing:
+                pipeline.get(keys[index])
+                pipeline.ttl(keys[index])
+            queued_stats = queue_pending_stats(pipeline)
+            results = pipeline.execute()
+            for position, index in enumerate(missing):
+                raw, ttl_seconds = results[2 * position], results[2 * position + 1]
+                if raw:
+                    embeddings[index] = unpack_embedding(raw)
+                    # Promote to tier 1 without outliving the Redis entry.
+                    set_local(keys[index], embeddings[index], ttl_seconds if ttl_seconds > 0 else appConfig["query_embedding_cache_ttl_seconds"])
+                    redis_hits += 1
+        except Exception as e:
+            restore_pending_stats(queued_stats)
+            logger.warning("query_embedding_cache_read_failed", error=str(e))
+
+    record_stats({"local_hits": local_hits, "redis_hits": redis_hits, "misses": len(queries) - local_hits - redis_hits})
+    logger.info("query_embedding_cache_lookup", queries=len(queries), local_hits=local_hits, redis_hits=redis_hits)
+    return embeddings
+
+
+def set_cached_query_embeddings(queries: List[str], embeddings: List[List[float]]) -> None:
+    if not queries:
+        return
+
+    ttl_seconds = appConfig["query_embedding_cache_ttl_seconds"]
+    keys = [query_embedding_cache_key(query) for query in queries]
+    for key, embedding in zip(keys, embeddings):
+        set_local(key, embedding, ttl_seconds)
+
+    queued_stats = {}
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        for key, embedding in zip(keys, embeddings):
+            pipeline.set(key, pack_embedding(embedding), ex=ttl_seconds)
+        queued_stats = queue_pending_stats(pipeline)
+        pipeline.execute()
+    except Exception as e:
+        restore_pending_stats(queued_stats)
+        logger.warning("query_embedding_cache_write_failed", error=str(e))
+
+
+def hit_rate(hits: int, total: int) -> float:
+    return round(hits / total, 4) if total else 0.0
+
+
+def get_query_embedding_cache_stats() -> dict:
+    """Hit rates of this process (local) and of all processes together (cluster, from the Redis counters)."""
+    with local_cache_lock:
+        process_stats = dict(local_stats, entries=len(local_cache))
+    process_lookups = process_stats["local_hits"] + process_stats["redis_hits"] + process_stats["misses"]
+    process_stats["hit_rate"] = hit_rate(process_stats["local_hits"] + process_stats["redis_hits"], process_lookups)
+
+    cluster_stats = {}
+    try:
+        cluster_stats = {key.decode(): int(value) for key, value in redis_client.hgetall(QUERY_EMBEDDING_CACHE_STATS_KEY).items()}
+        cluster_lookups = sum(cluster_stats.get(counter, 0) for counter in ("local_hits", "redis_hits", "misses"))
+        cluster_stats["hit_rate"] = hit_rate(cluster_stats.get("local_hits", 0) + cluster_stats.get("redis_hits", 0), cluster_lookups)
+    except Exception as e:
+        logger.warning("query_embedding_cache_stats_failed", error=str(e))
+
+    return {"process": process_stats, "cluster": cluster_stats}
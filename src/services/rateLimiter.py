@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from src.config.logging import get_logger
+from src.services.redis import broker_redis_client
+
+logger = get_logger(__name__)
+
+# Cluster-wide OpenAI rate limiter (Redis token buckets), shared by every API pod and Celery worker.
+#
+#   - Two buckets per model : requests/min and tokens/min (`rate_limit:{model}:rpm` / `rate_limit:{model}:tpm`),
+#     refilled continuously, checked and debited atomically by one Lua script (Redis server clock).
+#   - Priority : ingestion traffic must leave `RATE_LIMIT_INGESTION_RESERVE` of each bucket untouched, interactive chat
+#     traffic may use all of it - so chat keeps flowing while a big ingestion saturates the limits.
+#   - Token usage is estimated before the call and reconciled with the real usage afterwards (chat models).
+#   - Fails open : if Redis is unavailable the call simply goes through.
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_INGESTION = "ingestion"
+
+# Per-model limits, override with OPENAI_RATE_LIMITS='{"gpt-4o": {"rpm": 500, "tpm": 30000}}' to match your OpenAI tier.
+DEFAULT_RATE_LIMITS = {
+    "gpt-4o": {"rpm": 5000, "tpm": 800000},
+    "gpt-4o-mini": {"rpm": 5000, "tpm": 4000000},
+    "gpt-4-turbo": {"rpm": 5000, "tpm": 600000},
+    "text-embedding-3-large": {"rpm": 5000, "tpm": 5000000},
+}
+RATE_LIMITS = {**DEFAULT_RATE_LIMITS, **json.loads(os.getenv("OPENAI_RATE_LIMITS", "{}"))}
+INGESTION_RESERVE = float(os.getenv("RATE_LIMIT_INGESTION_RESERVE", "0.2"))
+MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120"))
+
+rate_limit_priority_var: ContextVar[Optional[str]] = ContextVar("rate_limit_priority", default=None)
+_default_priority = PRIORITY_INTERACTIVE
+
+# KEYS : rpm bucket, tpm bucket
+# ARGV : rpm capacity, tpm capacity, tokens requested, reserve fraction (share of the buckets this caller must not use)
+# Returns the seconds to wait before retrying ("0" = acquired and debited).
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local capacities = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local requested = {1, tonumber(ARGV[3])}
+local reserve_fraction = tonumber(ARGV[4])
+local levels = {}
+local wait = 0
+
+for i = 1, 2 do
+    local capacity = capacities[i]
+    local rate = capacity / 60.0
+    local bucket = redis.call('HMGET', KEYS[i], 'level', 'updated_at')
+    local level = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    level = math.min(capacity, level + math.max(0, now - updated_at) * rate)
+    levels[i] = level
+
+    local needed = math.min(requested[i], capacity) + capacity * reserve_fraction
+    if level < needed then
+        wait = math.max(wait, (needed - level) / rate)
+    end
+end
+
+for i = 1, 2 do
+    if wait == 0 then
+        levels[i] = levels[i] - requested[i]
+    end
+    redis.call('HSET', KEYS[i], 'level', levels[i], 'updated_at', now)
+    redis.call('EXPIRE', KEYS[i], 300)
+end
+
+return tostring(wait)
+"""
+
+_token_bucket = broker_redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+
+def set_default_rate_limit_priority(priority: str) -> None:
+    """Process-wide default priority (Celery workers switch to ingestion at start-up)."""
+    global _default_priority
+    _default_priority = priority
+
+
+def set_rate_limit_priority(priority: Optional[str]) -> None:
+    rate_limit_priority_var.set(priority)
+
+
+def get_rate_limit_priority() -> str:
+    return rate_limit_priority_var.get() or _default_priority
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text, good enough to pace requests.
+    return len(text) // 4 + 1
+
+
+def try_acquire(model: str, tokens: int, priority: Optional[str] = None) -> float:
+    """One attempt : debit the buckets and return 0, or return the seconds to wait. Unknown models are not limited."""
+    limits = RATE_LIMITS.get(model)
+    if not limits:
+        return 0.0
+
+    reserve_fraction = INGESTION_RESERVE if (priority or get_rate_limit_priority()) == PRIORITY_INGESTION else 0.0
+    try:
+        wait_time = _token_bucket(
+            keys=[f"rate_limit:{model}:rpm", f"rate_limit:{model}:tpm"],
+            args=[limits["rpm"], limits["tpm"], tokens, reserve_fraction],
+        )
+        return float(wait_time)
+    except Exception as e:
+        logger.warning("rate_limiter_unavailable", model=model, error=str(e))
+        return 0.0
+
+
+def acquire(model: str, tokens: int, priority: Optional[str] = None, max_wait_seconds: float = MAX_WAIT_SECONDS) -> None:
+    """Block until the model's request and token buckets allow this call (at most max_wait_seconds, then go anyway)."""
+    started_at = time.monotonic()
+    while True:
+        wait_time = try_acquire(model, tokens, priority)
+        if wait_time <= 0:
+            return
+        if time.monotonic() - started_at + wait_time > max_wait_seconds:
+            logger.warning("rate_limit_wait_exceeded", model=model, tokens=tokens, priority=priority or get_rate_limit_priority())
+            return
+        # Jitter so waiting callers across the cluster do not retry in lockstep.
+        time.sleep(min(wait_time, 5.0) * random.uniform(1.0, 1.2))
+
+
+async def aacquire(model: str, tokens: int, priority: Optional[str] = None, max_wait_seconds: float = MAX_WAIT_SECONDS) -> None:
+    started_at = time.monotonic()
+    while True:
+        wait_time = await asyncio.to_thread(try_acquire, model, tokens, priority)
+        if wait_time <= 0:
+            return
+        if time.monotonic() - started_at + wait_time > max_wait_seconds:
+            logger.warning("rate_limit_wait_exceeded", model=model, tokens=tokens, priority=priority or get_rate_limit_priority())
+            return
+        await asyncio.sleep(min(wait_time, 5.0) * random.uniform(1.0, 1.2))
+
+
+def record_token_usage(model: str, estimated_tokens: int, actual_tokens: int) -> None:
+    """Correct the tokens/min bucket once the real usage of a call is known (estimate was debited up front)."""
+    if model not in RATE_LIMITS or actual_tokens == estimated_tokens:
+        return
+    try:
+        broker_redis_client.hincrbyfloat(f"rate_limit:{model}:tpm", "level", estimated_tokens - actual_tokens)
+    except Exception as e:
+        logger.warning("rate_limiter_unavailable", model=model, error=str(e))
+
+
+class RedisRateLimiter(BaseRateLimiter):
+    """
+    LangChain rate limiter for chat models (`ChatOpenAI(rate_limiter=...)`), so agents are limited too.
+    LangChain does not pass the prompt to the limiter, so `estimated_tokens` per request is debited up front and
+    TokenUsageRecorder reconciles it with the real usage.
+    """
+
+    def __init__(self, model: str, estimated_tokens: int):
+        self.model = model
+        self.estimated_tokens = estimated_tokens
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return try_acquire(self.model, self.estimated_tokens) <= 0
+        acquire(self.model, self.estimated_tokens)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return await asyncio.to_thread(try_acquire, self.model, self.estimated_tokens) <= 0
+        await aacquire(self.model, self.estimated_tokens)
+        return True
+
+
+class TokenUsageRecorder(BaseCallbackHandler):
+    """Reports the real token usage of every chat model call back to the limiter."""
+
+    def __init__(self, model: str, estimated_tokens: int):
+        self.model = model
+        self.estimated_tokens = estimated_tokens
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if token_usage.get("total_tokens"):
+            record_token_usage(self.model, self.estimated_tokens, token_usage["total_tokens"])
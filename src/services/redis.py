@@ -0,0 +1,8 @@
+import redis
+from src.config.index import appConfig
+
+# Application cache (embeddings, summaries, ...). Defaults to the Celery broker's Redis unless CACHE_REDIS_URL is set.
+redis_client = redis.Redis.from_url(appConfig["cache_redis_url"])
+
+# Cluster-wide coordination state (rate limiter buckets, ...) lives on the broker's Redis, shared by API pods and workers.
+broker_redis_client = redis.Redis.from_url(appConfig["redis_url"])
@@ -1,6 +1,13 @@
-from supabase import Client, create_client
+from supabase import Client, ClientOptions, create_client
 from src.config.index import appConfig
 
 supabase: Client = create_client(
     appConfig["supabase_api_url"], appConfig["supabase_secret_key"]
 )
+
+# Retrieval searches : a request timeout bounds the database calls given up after the search deadline.
+search_supabase: Client = create_client(
+    appConfig["supabase_api_url"],
+    appConfig["supabase_secret_key"],
+    options=ClientOptions(postgrest_client_timeout=appConfig["retrieval_search_timeout_seconds"]),
+)
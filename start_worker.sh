@@ -7,10 +7,46 @@ cd "$SCRIPT_DIR"
 # Ensure Homebrew binaries (like tesseract) are on PATH for "macOS"
 export PATH="/opt/homebrew/bin:$PATH"
 
-echo "Starting Celery Worker (foreground)..."
+# Usage : ./start_worker.sh [cpu|io|beat|all]   (default : all)
+#   cpu : partitioning queue, threads pool with low concurrency (CPU_WORKER_CONCURRENCY, default 2). Not prefork :
+#         prefork children are daemonic and cannot start the process pool that partitions PDF page ranges in
+#         parallel (PDF_PARTITION_WORKERS per document), they would fall back to serial partitioning.
+#   io  : summarise / embed / store queue, threads pool (IO_WORKER_CONCURRENCY, default 32)
+#   beat : Celery beat, periodic dispatch of the fair ingestion scheduler (run exactly one per deployment)
+#   all : both workers and beat, the cpu worker and beat in the background
+WORKER_TYPE="${1:-all}"
+CPU_WORKER_CONCURRENCY="${CPU_WORKER_CONCURRENCY:-2}"
+IO_WORKER_CONCURRENCY="${IO_WORKER_CONCURRENCY:-32}"
+
+echo "Starting Celery Worker(s) ($WORKER_TYPE)..."
+
+run_cpu_worker () {
+  "$1" -A src.services.celery:celery_app worker --loglevel=info -n cpu@%h -Q ingestion_cpu --pool=threads --concurrency="$CPU_WORKER_CONCURRENCY" --without-gossip --without-mingle --without-heartbeat
+}
+
+run_io_worker () {
+  # "celery" (default queue) too, for tasks queued before the ingestion queues existed.
+  "$1" -A src.services.celery:celery_app worker --loglevel=info -n io@%h -Q ingestion_io,celery --pool=threads --concurrency="$IO_WORKER_CONCURRENCY" --without-gossip --without-mingle --without-heartbeat
+}
+
+run_beat () {
+  "$1" -A src.services.celery:celery_app beat --loglevel=info
+}
 
 run_celery () {
-  "$1" -A src.services.celery:celery_app worker --loglevel=info --pool=threads --without-gossip --without-mingle --without-heartbeat
+  case "$WORKER_TYPE" in
+    cpu) run_cpu_worker "$1" ;;
+    io) run_io_worker "$1" ;;
+    beat) run_beat "$1" ;;
+    *)
+      run_cpu_worker "$1" &
+      CPU_WORKER_PID=$!
+      run_beat "$1" &
+      BEAT_PID=$!
+      trap 'kill $CPU_WORKER_PID $BEAT_PID 2>/dev/null' EXIT
+      run_io_worker "$1"
+      ;;
+  esac
 }
 
 # Try Poetry-managed environment first
@@ -0,0 +1,27 @@
+-- Atomic processing status update.
+-- Sets processing_status and shallow-merges new_details into processing_details in ONE statement,
+-- so concurrent progress updates for the same document can no longer overwrite each other
+-- (replaces the SELECT processing_details -> merge in Python -> UPDATE round trips).
+
+CREATE OR REPLACE FUNCTION update_document_processing_status(
+    target_document_id uuid,
+    new_status text,
+    new_details jsonb DEFAULT '{}'::jsonb
+)
+RETURNS TABLE(
+    id uuid,
+    processing_status text
+)
+LANGUAGE sql
+AS $function$
+UPDATE
+    project_documents pd
+SET
+    processing_status = new_status,
+    processing_details = (COALESCE(pd.processing_details::jsonb, '{}'::jsonb) || COALESCE(new_details, '{}'::jsonb))::json
+WHERE
+    pd.id = target_document_id
+RETURNING
+    pd.id,
+    pd.processing_status;
+$function$;
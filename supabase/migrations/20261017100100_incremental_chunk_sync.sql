@@ -0,0 +1,52 @@
+-- Incremental re-ingestion
+-- Every chunk stores a fingerprint of its content so a re-ingested document can be diffed against its stored chunks.
+
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS document_chunks_document_id_content_hash_idx ON document_chunks (document_id, content_hash);
+
+
+-- Applies the chunk diff of a re-ingested document in ONE transaction:
+--   * deletes every chunk of the document that is neither kept nor newly inserted (removed chunks)
+--   * renumbers the kept chunks (chunk_index / page_number) to their position in the new version
+-- Newly inserted chunks already carry their final chunk_index.
+
+CREATE OR REPLACE FUNCTION sync_document_chunks(
+    target_document_id uuid,
+    keep_chunk_ids uuid[],
+    keep_chunk_indexes integer[],
+    keep_page_numbers integer[],
+    new_chunk_ids uuid[]
+)
+RETURNS TABLE(
+    removed_chunks integer,
+    renumbered_chunks integer
+)
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    removed_count integer;
+    renumbered_count integer;
+BEGIN
+    DELETE FROM document_chunks dc
+    WHERE
+        dc.document_id = target_document_id
+        AND NOT (dc.id = ANY(keep_chunk_ids))
+        AND NOT (dc.id = ANY(new_chunk_ids));
+    GET DIAGNOSTICS removed_count = ROW_COUNT;
+
+    UPDATE document_chunks dc
+    SET
+        chunk_index = kept.chunk_index,
+        page_number = kept.page_number
+    FROM
+        unnest(keep_chunk_ids, keep_chunk_indexes, keep_page_numbers) AS kept(id, chunk_index, page_number)
+    WHERE
+        dc.id = kept.id
+        AND dc.document_id = target_document_id
+        AND (dc.chunk_index IS DISTINCT FROM kept.chunk_index OR dc.page_number IS DISTINCT FROM kept.page_number);
+    GET DIAGNOSTICS renumbered_count = ROW_COUNT;
+
+    RETURN QUERY SELECT removed_count, renumbered_count;
+END;
+$function$;
@@ -0,0 +1,73 @@
+-- Whole-document dedup
+-- Uploaded files store a checksum (S3 ETag), so a re-upload of a file that was already ingested
+-- can reuse the existing chunks and embeddings instead of running the ingestion pipeline again.
+
+ALTER TABLE project_documents ADD COLUMN IF NOT EXISTS checksum TEXT;
+
+CREATE INDEX IF NOT EXISTS project_documents_clerk_id_checksum_idx ON project_documents (clerk_id, checksum);
+
+
+-- Copies every chunk (content, embedding, ...) of source_document_id to target_document_id server-side
+-- and marks the target document as completed, all in ONE transaction.
+
+CREATE OR REPLACE FUNCTION clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid
+)
+RETURNS TABLE(
+    id uuid,
+    processing_status text,
+    cloned_chunks integer
+)
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    cloned_count integer;
+BEGIN
+    INSERT INTO document_chunks (
+        document_id,
+        content,
+        chunk_index,
+        page_number,
+        char_count,
+        type,
+        original_content,
+        embedding,
+        content_hash
+    )
+    SELECT
+        target_document_id,
+        dc.content,
+        dc.chunk_index,
+        dc.page_number,
+        dc.char_count,
+        dc.type,
+        dc.original_content,
+        dc.embedding,
+        dc.content_hash
+    FROM
+        document_chunks dc
+    WHERE
+        dc.document_id = source_document_id;
+    GET DIAGNOSTICS cloned_count = ROW_COUNT;
+
+    RETURN QUERY
+    UPDATE
+        project_documents pd
+    SET
+        processing_status = 'completed',
+        processing_details = (
+            COALESCE(source.processing_details::jsonb, '{}'::jsonb)
+            || jsonb_build_object('deduplicated_from', source_document_id)
+        )::json
+    FROM
+        project_documents source
+    WHERE
+        pd.id = target_document_id
+        AND source.id = source_document_id
+    RETURNING
+        pd.id,
+        pd.processing_status,
+        cloned_count;
+END;
+$function$;
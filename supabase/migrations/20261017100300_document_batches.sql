@@ -0,0 +1,7 @@
+-- Batch ingestion
+-- Documents created together by the batch endpoint share a batch_id, so the progress of the whole batch
+-- can be read in one query.
+
+ALTER TABLE project_documents ADD COLUMN IF NOT EXISTS batch_id UUID;
+
+CREATE INDEX IF NOT EXISTS project_documents_batch_id_idx ON project_documents (batch_id);
@@ -0,0 +1,62 @@
+-- Slim chunk search functions
+-- Same matching and ordering as vector_search_document_chunks / keyword_search_document_chunks, but only the chunk id,
+-- document id and score are returned. The retrieval strategies fuse (RRF) and cut these lists first, then hydrate the
+-- few chunks that make it into the context with one query - embeddings and original_content of the discarded
+-- candidates never leave the database.
+
+CREATE OR REPLACE FUNCTION vector_search_document_chunk_ids(
+    query_embedding vector, 
+    filter_document_ids uuid[], 
+    match_threshold double precision DEFAULT 0.3, 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    1 - (dc.embedding <=> query_embedding) AS score
+FROM
+    document_chunks dc
+WHERE
+    dc.document_id = ANY(filter_document_ids)
+    AND dc.embedding IS NOT NULL
+    AND (1 - (dc.embedding <=> query_embedding)) > match_threshold  
+ORDER BY 
+    dc.embedding <=> query_embedding ASC  
+LIMIT 
+    chunks_per_search;
+$function$;
+
+
+CREATE OR REPLACE FUNCTION keyword_search_document_chunk_ids(
+    query_text text, 
+    filter_document_ids uuid[], 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text))::double precision AS score
+FROM
+    document_chunks dc
+WHERE
+    dc.fts @@ websearch_to_tsquery('english', query_text)
+    AND dc.document_id = ANY(filter_document_ids)
+ORDER BY 
+    score DESC
+LIMIT 
+    chunks_per_search;
+$function$;
@@ -0,0 +1,68 @@
+-- Server-side hybrid search
+-- Vector and keyword legs run in one statement and are fused with weighted Reciprocal Rank Fusion in Postgres:
+--     score = sum over legs of leg_weight / (rrf_k + rank in leg)      (rank starting at 1, same as rrf_rank_and_fuse)
+-- Like the slim search functions only id, document_id and the fused score are returned (hydrated afterwards).
+-- result_limit caps the fused rows (NULL = every candidate of both legs, needed when fusing several queries again).
+
+CREATE OR REPLACE FUNCTION hybrid_search_document_chunks(
+    query_embedding vector, 
+    query_text text, 
+    filter_document_ids uuid[], 
+    match_threshold double precision DEFAULT 0.3, 
+    chunks_per_search integer DEFAULT 20, 
+    vector_weight double precision DEFAULT 0.5, 
+    keyword_weight double precision DEFAULT 0.5, 
+    rrf_k integer DEFAULT 60, 
+    result_limit integer DEFAULT NULL
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+WITH vector_results AS (
+    SELECT
+        dc.id,
+        dc.document_id,
+        row_number() OVER (ORDER BY dc.embedding <=> query_embedding ASC) AS rank
+    FROM
+        document_chunks dc
+    WHERE
+        dc.document_id = ANY(filter_document_ids)
+        AND dc.embedding IS NOT NULL
+        AND (1 - (dc.embedding <=> query_embedding)) > match_threshold
+    ORDER BY 
+        dc.embedding <=> query_embedding ASC
+    LIMIT 
+        chunks_per_search
+),
+keyword_results AS (
+    SELECT
+        dc.id,
+        dc.document_id,
+        row_number() OVER (ORDER BY ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text)) DESC) AS rank
+    FROM
+        document_chunks dc
+    WHERE
+        dc.fts @@ websearch_to_tsquery('english', query_text)
+        AND dc.document_id = ANY(filter_document_ids)
+    ORDER BY 
+        ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text)) DESC
+    LIMIT 
+        chunks_per_search
+)
+SELECT
+    COALESCE(v.id, k.id) AS id,
+    COALESCE(v.document_id, k.document_id) AS document_id,
+    COALESCE(vector_weight / (rrf_k + v.rank), 0) + COALESCE(keyword_weight / (rrf_k + k.rank), 0) AS score
+FROM
+    vector_results v
+    FULL OUTER JOIN keyword_results k ON k.id = v.id
+ORDER BY 
+    score DESC, 
+    v.rank ASC NULLS LAST
+LIMIT 
+    result_limit;
+$function$;
@@ -0,0 +1,275 @@
+-- Committed chunks
+-- Chunks are inserted uncommitted while a document is (re-)ingested and only become searchable once
+-- sync_document_chunks swaps them in, in ONE transaction with the removal of the previous version.
+-- Search is gated on committed chunks instead of the document's processing_status, so a document being
+-- re-ingested (or whose re-ingestion failed) stays searchable with its last good version.
+-- Existing chunks and the chunks cloned by clone_document_chunks are committed (column default).
+
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS committed BOOLEAN NOT NULL DEFAULT true;
+
+
+-- sync_document_chunks (see the incremental chunk sync migration) now also commits the newly inserted chunks.
+-- Full ingestion passes empty keep lists : every chunk of the previous version is removed.
+CREATE OR REPLACE FUNCTION sync_document_chunks(
+    target_document_id uuid,
+    keep_chunk_ids uuid[],
+    keep_chunk_indexes integer[],
+    keep_page_numbers integer[],
+    new_chunk_ids uuid[]
+)
+RETURNS TABLE(
+    removed_chunks integer,
+    renumbered_chunks integer
+)
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    removed_count integer;
+    renumbered_count integer;
+BEGIN
+    DELETE FROM document_chunks dc
+    WHERE
+        dc.document_id = target_document_id
+        AND NOT (dc.id = ANY(keep_chunk_ids))
+        AND NOT (dc.id = ANY(new_chunk_ids));
+    GET DIAGNOSTICS removed_count = ROW_COUNT;
+
+    UPDATE document_chunks dc
+    SET
+        chunk_index = kept.chunk_index,
+        page_number = kept.page_number
+    FROM
+        unnest(keep_chunk_ids, keep_chunk_indexes, keep_page_numbers) AS kept(id, chunk_index, page_number)
+    WHERE
+        dc.id = kept.id
+        AND dc.document_id = target_document_id
+        AND (dc.chunk_index IS DISTINCT FROM kept.chunk_index OR dc.page_number IS DISTINCT FROM kept.page_number);
+    GET DIAGNOSTICS renumbered_count = ROW_COUNT;
+
+    UPDATE document_chunks dc
+    SET
+        committed = true
+    WHERE
+        dc.id = ANY(new_chunk_ids)
+        AND dc.document_id = target_document_id;
+
+    RETURN QUERY SELECT removed_count, renumbered_count;
+END;
+$function$;
+
+
+-- Search functions : only committed chunks.
+
+
+CREATE OR REPLACE FUNCTION vector_search_document_chunks(
+    query_embedding vector, 
+    filter_document_ids uuid[], 
+    match_threshold double precision DEFAULT 0.3, 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    content text, 
+    chunk_index integer, 
+    created_at timestamp with time zone, 
+    page_number integer, 
+    char_count integer, 
+    type jsonb, 
+    original_content jsonb, 
+    embedding vector
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    dc.content,
+    dc.chunk_index,
+    dc.created_at,
+    dc.page_number,
+    dc.char_count,
+    dc.type,
+    dc.original_content,
+    dc.embedding
+FROM
+    document_chunks dc
+WHERE
+    dc.document_id = ANY(filter_document_ids)
+    AND dc.committed
+    AND dc.embedding IS NOT NULL
+    AND (1 - (dc.embedding <=> query_embedding)) > match_threshold  
+ORDER BY 
+    dc.embedding <=> query_embedding ASC  
+LIMIT 
+    chunks_per_search;
+$function$;
+
+
+CREATE OR REPLACE FUNCTION keyword_search_document_chunks(
+    query_text text, 
+    filter_document_ids uuid[], 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    content text, 
+    chunk_index integer, 
+    created_at timestamp with time zone, 
+    page_number integer, 
+    char_count integer, 
+    type jsonb, 
+    original_content jsonb, 
+    embedding vector
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    dc.content,
+    dc.chunk_index,
+    dc.created_at,
+    dc.page_number,
+    dc.char_count,
+    dc.type,
+    dc.original_content,
+    dc.embedding
+FROM
+    document_chunks dc
+WHERE
+    dc.fts @@ websearch_to_tsquery('english', query_text)
+    AND dc.document_id = ANY(filter_document_ids)
+    AND dc.committed
+ORDER BY 
+    ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text)) DESC
+LIMIT 
+    chunks_per_search;
+$function$;
+
+
+CREATE OR REPLACE FUNCTION vector_search_document_chunk_ids(
+    query_embedding vector, 
+    filter_document_ids uuid[], 
+    match_threshold double precision DEFAULT 0.3, 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    1 - (dc.embedding <=> query_embedding) AS score
+FROM
+    document_chunks dc
+WHERE
+    dc.document_id = ANY(filter_document_ids)
+    AND dc.committed
+    AND dc.embedding IS NOT NULL
+    AND (1 - (dc.embedding <=> query_embedding)) > match_threshold  
+ORDER BY 
+    dc.embedding <=> query_embedding ASC  
+LIMIT 
+    chunks_per_search;
+$function$;
+
+
+CREATE OR REPLACE FUNCTION keyword_search_document_chunk_ids(
+    query_text text, 
+    filter_document_ids uuid[], 
+    chunks_per_search integer DEFAULT 20
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+SELECT
+    dc.id,
+    dc.document_id,
+    ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text))::double precision AS score
+FROM
+    document_chunks dc
+WHERE
+    dc.fts @@ websearch_to_tsquery('english', query_text)
+    AND dc.document_id = ANY(filter_document_ids)
+    AND dc.committed
+ORDER BY 
+    score DESC
+LIMIT 
+    chunks_per_search;
+$function$;
+
+
+CREATE OR REPLACE FUNCTION hybrid_search_document_chunks(
+    query_embedding vector, 
+    query_text text, 
+    filter_document_ids uuid[], 
+    match_threshold double precision DEFAULT 0.3, 
+    chunks_per_search integer DEFAULT 20, 
+    vector_weight double precision DEFAULT 0.5, 
+    keyword_weight double precision DEFAULT 0.5, 
+    rrf_k integer DEFAULT 60, 
+    result_limit integer DEFAULT NULL
+)
+RETURNS TABLE(
+    id uuid, 
+    document_id uuid, 
+    score double precision
+)
+LANGUAGE sql
+AS $function$
+WITH vector_results AS (
+    SELECT
+        dc.id,
+        dc.document_id,
+        row_number() OVER (ORDER BY dc.embedding <=> query_embedding ASC) AS rank
+    FROM
+        document_chunks dc
+    WHERE
+        dc.document_id = ANY(filter_document_ids)
+        AND dc.committed
+        AND dc.embedding IS NOT NULL
+        AND (1 - (dc.embedding <=> query_embedding)) > match_threshold
+    ORDER BY 
+        dc.embedding <=> query_embedding ASC
+    LIMIT 
+        chunks_per_search
+),
+keyword_results AS (
+    SELECT
+        dc.id,
+        dc.document_id,
+        row_number() OVER (ORDER BY ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text)) DESC) AS rank
+    FROM
+        document_chunks dc
+    WHERE
+        dc.fts @@ websearch_to_tsquery('english', query_text)
+        AND dc.document_id = ANY(filter_document_ids)
+        AND dc.committed
+    ORDER BY 
+        ts_rank_cd(dc.fts, websearch_to_tsquery('english', query_text)) DESC
+    LIMIT 
+        chunks_per_search
+)
+SELECT
+    COALESCE(v.id, k.id) AS id,
+    COALESCE(v.document_id, k.document_id) AS document_id,
+    COALESCE(vector_weight / (rrf_k + v.rank), 0) + COALESCE(keyword_weight / (rrf_k + k.rank), 0) AS score
+FROM
+    vector_results v
+    FULL OUTER JOIN keyword_results k ON k.id = v.id
+ORDER BY 
+    score DESC, 
+    v.rank ASC NULLS LAST
+LIMIT 
+    result_limit;
+$function$;
@@ -0,0 +1,84 @@
+-- Project-scoped document dedup
+-- Cloned chunks keep the image keys of their source (`projects/{project_id}/images/...`), and those images are deleted
+-- with their project : a document is only deduplicated against documents of its own project.
+-- Only the committed chunks of the source are cloned - uncommitted leftovers of a failed or running ingestion are not
+-- part of its searchable version.
+
+CREATE INDEX IF NOT EXISTS project_documents_project_id_checksum_idx ON project_documents (project_id, checksum);
+
+DROP INDEX IF EXISTS project_documents_clerk_id_checksum_idx;
+
+
+CREATE OR REPLACE FUNCTION clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid
+)
+RETURNS TABLE(
+    id uuid,
+    processing_status text,
+    cloned_chunks integer
+)
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    cloned_count integer;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM project_documents source
+        JOIN project_documents target ON target.project_id = source.project_id
+        WHERE source.id = source_document_id AND target.id = target_document_id
+    ) THEN
+        RAISE EXCEPTION 'clone_document_chunks: % and % are not documents of the same project', source_document_id, target_document_id;
+    END IF;
+
+    INSERT INTO document_chunks (
+        document_id,
+        content,
+        chunk_index,
+        page_number,
+        char_count,
+        type,
+        original_content,
+        embedding,
+        content_hash,
+        committed
+    )
+    SELECT
+        target_document_id,
+        dc.content,
+        dc.chunk_index,
+        dc.page_number,
+        dc.char_count,
+        dc.type,
+        dc.original_content,
+        dc.embedding,
+        dc.content_hash,
+        true
+    FROM
+        document_chunks dc
+    WHERE
+        dc.document_id = source_document_id
+        AND dc.committed;
+    GET DIAGNOSTICS cloned_count = ROW_COUNT;
+
+    RETURN QUERY
+    UPDATE
+        project_documents pd
+    SET
+        processing_status = 'completed',
+        processing_details = (
+            COALESCE(source.processing_details::jsonb, '{}'::jsonb)
+            || jsonb_build_object('deduplicated_from', source_document_id)
+        )::json
+    FROM
+        project_documents source
+    WHERE
+        pd.id = target_document_id
+        AND source.id = source_document_id
+    RETURNING
+        pd.id,
+        pd.processing_status,
+        cloned_count;
+END;
+$function$;
@@ -0,0 +1,24 @@
+-- Batch upload confirmation
+-- Queues the confirmed uploads of a batch and stores their checksums (S3 ETag, see the document checksum dedup
+-- migration) in ONE statement. Only documents still pending are updated, so a repeated confirm queues nothing twice.
+
+CREATE OR REPLACE FUNCTION queue_uploaded_documents(
+    document_ids uuid[],
+    document_checksums text[]
+)
+RETURNS SETOF project_documents
+LANGUAGE sql
+AS $function$
+    UPDATE
+        project_documents pd
+    SET
+        processing_status = 'queued',
+        checksum = uploaded.checksum
+    FROM
+        unnest(document_ids, document_checksums) AS uploaded(id, checksum)
+    WHERE
+        pd.id = uploaded.id
+        AND pd.processing_status = 'pending'
+    RETURNING
+        pd.*;
+$function$;